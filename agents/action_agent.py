@@ -2,10 +2,66 @@
 Action & Dependency Extraction Agent
 Extracts actionable tasks with dependencies, owners, and deadlines
 """
-from openai import OpenAI
-from typing import Dict, Any, List
-import json
-import re
+from openai import AsyncOpenAI
+from typing import Dict, Any, List, AsyncIterator
+from utils.openai_client import get_client, get_async_client
+from utils.ratelimit import acreate_limited, get_rate_limiter
+from utils.retry import acall_with_retry, call_with_retry
+from utils import fast_json
+from utils.prompt_caching import build_system_message, uses_automatic_caching
+from utils.dedup import word_shingles, is_near_duplicate, semantic_dedup_indices
+from utils.streaming import JsonArrayItemScanner, JsonStreamAccumulator, extract_json
+from utils.structured_output import enum_string, json_schema_format, strict_object, string_array
+from .cache import AgentCache, get_agent_cache
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Static prompt templates, kept as constants so the head of every user prompt
+# is byte-identical and only the document/context slots vary.
+_ACTION_USER_TEMPLATE = """
+Analyze the following document and identify actionable tasks:
+
+DOCUMENT:
+{document}
+
+Extract specifically:
+- Actionable tasks
+- Owners (defaults to 'Unassigned')
+- deadlines
+- Dependencies
+- Priority (high/medium/low)
+
+LIMIT TO THE TOP 5 MOST CRITICAL ACTIONS ONLY.
+KEEP DESCRIPTIONS SHORT (under 15 words).
+Focus on high-impact items to ensure the response fits within limits.
+
+Remember to respond with a valid JSON array of action items."""
+
+_ACTION_CONTEXT_SUFFIX = """
+
+ADDITIONAL CONTEXT (from summary):
+{context}
+
+Use this context to better understand the document's intent and identify implicit actions."""
+
+_ACTION_CLOSING = "\n\nRemember to respond with a valid JSON array of action items."
+
+# Structured outputs need an object at the top level, so the array is wrapped
+_ACTION_RESPONSE_FORMAT = json_schema_format("actions", strict_object({
+    "actions": {
+        "type": "array",
+        "items": strict_object({
+            "task": {"type": "string"},
+            "owner": {"type": "string"},
+            "deadline": {"type": "string"},
+            "dependencies": string_array(),
+            "priority": enum_string(["high", "medium", "low"]),
+            "status": enum_string(["pending", "in-progress", "blocked"])
+        })
+    }
+}))
 
 
 class ActionAgent:
@@ -44,6 +100,137 @@ Guidelines:
 
 Be thorough but precise. Do not invent tasks not implied by the document."""
     
+    # Fixed worked examples appended to the system message for OpenAI models so
+    # the static prefix exceeds the 1024-token automatic prompt-caching threshold
+    # (about 1.26k tokens measured; tests/test_prompt_caching.py keeps a margin)
+    FEW_SHOT_EXAMPLES = """
+
+EXAMPLE 1
+Document excerpt:
+"Priya will send the revised vendor contract to legal by March 14. Once legal signs off, Marco needs to
+schedule the onboarding call with the vendor. We also need to double-check that the security questionnaire
+was submitted; nobody owns that yet. The budget review is blocked until finance publishes Q2 numbers."
+
+Expected response:
+[
+    {
+        "task": "Send revised vendor contract to legal",
+        "owner": "Priya",
+        "deadline": "March 14",
+        "dependencies": [],
+        "priority": "high",
+        "status": "pending"
+    },
+    {
+        "task": "Schedule vendor onboarding call",
+        "owner": "Marco",
+        "deadline": "Not specified",
+        "dependencies": ["Send revised vendor contract to legal"],
+        "priority": "medium",
+        "status": "pending"
+    },
+    {
+        "task": "Verify security questionnaire was submitted",
+        "owner": "Not specified",
+        "deadline": "Not specified",
+        "dependencies": [],
+        "priority": "medium",
+        "status": "pending"
+    },
+    {
+        "task": "Complete budget review",
+        "owner": "Not specified",
+        "deadline": "Not specified",
+        "dependencies": ["Finance publishes Q2 numbers"],
+        "priority": "medium",
+        "status": "blocked"
+    }
+]
+
+EXAMPLE 2
+Document excerpt:
+"The mobile release slips to next sprint. QA (Dana's team) must finish regression on Android before we cut
+the release branch, ideally by end of week. Design already shipped the new icons, so no action there. Sam is
+still working on the crash fix for the login screen and expects to merge it tomorrow."
+
+Expected response:
+[
+    {
+        "task": "Finish Android regression testing",
+        "owner": "Dana's QA team",
+        "deadline": "End of week",
+        "dependencies": [],
+        "priority": "high",
+        "status": "pending"
+    },
+    {
+        "task": "Merge login screen crash fix",
+        "owner": "Sam",
+        "deadline": "Tomorrow",
+        "dependencies": [],
+        "priority": "high",
+        "status": "in-progress"
+    },
+    {
+        "task": "Cut mobile release branch",
+        "owner": "Not specified",
+        "deadline": "Next sprint",
+        "dependencies": ["Finish Android regression testing", "Merge login screen crash fix"],
+        "priority": "medium",
+        "status": "pending"
+    }
+]
+
+EXAMPLE 3
+Document excerpt:
+"Action items from the hiring sync: the recruiting team should post the senior data engineer role this
+week. Before interviews start, someone has to update the take-home exercise, which still references the
+old warehouse. Lena offered to draft the interview rubric but wants feedback from the platform leads first.
+We agreed the offer approval process stays as is, and the team offsite was already booked for October."
+
+Expected response:
+[
+    {
+        "task": "Post senior data engineer role",
+        "owner": "Recruiting team",
+        "deadline": "This week",
+        "dependencies": [],
+        "priority": "high",
+        "status": "pending"
+    },
+    {
+        "task": "Update take-home exercise for the new warehouse",
+        "owner": "Not specified",
+        "deadline": "Before interviews start",
+        "dependencies": [],
+        "priority": "medium",
+        "status": "pending"
+    },
+    {
+        "task": "Collect platform leads' feedback on interview rubric",
+        "owner": "Lena",
+        "deadline": "Not specified",
+        "dependencies": [],
+        "priority": "medium",
+        "status": "pending"
+    },
+    {
+        "task": "Draft interview rubric",
+        "owner": "Lena",
+        "deadline": "Before interviews start",
+        "dependencies": ["Collect platform leads' feedback on interview rubric"],
+        "priority": "medium",
+        "status": "pending"
+    }
+]
+
+Note that completed work ("Design already shipped the new icons") is not an action item, and that
+in-progress or blocked work keeps its status from the document. Dependencies refer to other tasks by
+their task description, or to an external event when the blocker is outside the team ("Finance publishes
+Q2 numbers"). Owners are copied as written (a person, a team, or a role); never guess a name that the
+document does not mention. Deadlines keep the document's wording ("End of week", "Tomorrow") rather
+than being converted into calendar dates."""
+    
     def __init__(self, llm_config: Dict[str, Any]):
         """
         Initialize the Action Agent
@@ -53,90 +240,218 @@ Be thorough but precise. Do not invent tasks not implied by the document."""
         """
         config = llm_config["config_list"][0]
         
-        # Initialize OpenAI client with optional base_url for OpenRouter
-        client_kwargs = {"api_key": config["api_key"]}
-        if "base_url" in config:
-            client_kwargs["base_url"] = config["base_url"]
-        
-        self.client = OpenAI(**client_kwargs)
+        # Shared OpenAI client with optional base_url for OpenRouter
+        self.api_key = config["api_key"]
+        self.base_url = config.get("base_url")
+        self.client = get_client(self.api_key, self.base_url)
         self.model = config["model"]
         self.temperature = llm_config.get("temperature", 0.3)
         self.max_tokens = llm_config.get("max_tokens", 4096)
+        
+        # Byte-identical across calls so the provider can cache the prefix
+        self.system_prompt = self.SYSTEM_MESSAGE
+        if uses_automatic_caching(self.model):
+            self.system_prompt += self.FEW_SHOT_EXAMPLES
+        self.max_concurrency = llm_config.get("max_concurrency", 8)
+        self.stream = llm_config.get("stream", False)
+        self.structured_output = llm_config.get("structured_output", False)
+        self.semantic_dedup = llm_config.get("semantic_dedup", False)
+        self.rate_limiter = get_rate_limiter(
+            self.api_key, self.model, llm_config.get("rate_limit_rpm", 0), llm_config.get("rate_limit_tpm", 0)
+        )
+        self.cache = get_agent_cache(llm_config.get("cache_ttl", 3600)) if llm_config.get("enable_cache") else None
+    
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """Async client shared across agents on the running event loop"""
+        return get_async_client(self.api_key, self.base_url)
     
-    def process_document(self, document_text: str, context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def _format_context(self, context: Dict[str, Any] = None) -> str:
+        """Serialize context for the prompt (empty when there is none)"""
+        return fast_json.dumps(context, indent=True) if context else ""
+    
+    def _build_prompt(
+        self,
+        document_text: str,
+        context: Dict[str, Any] = None,
+        context_text: str = None
+    ) -> str:
+        """Build the user prompt for a document and optional (pre-serialized) context"""
+        if context_text is None:
+            context_text = self._format_context(context)
+        prompt = _ACTION_USER_TEMPLATE.format(document=document_text)
+        if context_text:
+            prompt += _ACTION_CONTEXT_SUFFIX.format(context=context_text)
+        return prompt + _ACTION_CLOSING
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, Any]]:
+        """Build the chat messages for a prompt, keeping the static system message first"""
+        return [
+            build_system_message(self.system_prompt, self.model),
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _request_kwargs(self, prompt: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for a prompt"""
+        kwargs = {
+            "model": self.model,
+            "messages": self._build_messages(prompt),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if self.structured_output:
+            kwargs["response_format"] = _ACTION_RESPONSE_FORMAT
+        return kwargs
+    
+    async def _acreate(self, prompt: str, **kwargs) -> Any:
+        """Send a chat completion request (with retries) once the shared rate limit allows it"""
+        return await acreate_limited(
+            self.aclient.chat.completions,
+            self.rate_limiter,
+            len(prompt) // 4,
+            **self._request_kwargs(prompt),
+            **kwargs
+        )
+    
+    def _parse_response(self, response) -> List[Dict[str, Any]]:
+        """Extract action items from a chat completion response"""
+        content = response.choices[0].message.content
+        logger.debug("Finish reason: %s", response.choices[0].finish_reason)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received response: %s...", content[:200] if content else "EMPTY/NULL")
+        
+        result = self._extract_json(content if content else "[]")
+        logger.debug("Parsed %d action items", len(result))
+        return result
+    
+    def process_document(
+        self,
+        document_text: str,
+        context: Dict[str, Any] = None,
+        context_text: str = None
+    ) -> List[Dict[str, Any]]:
         """
         Process a document and extract action items
         
         Args:
             document_text: The document text to analyze
             context: Optional context from other agents (e.g., summary)
+            context_text: Optional pre-serialized context, shared across chunks
             
         Returns:
             List of action items with metadata
         """
-        prompt = f"""
-Analyze the following document and identify actionable tasks:
-
-DOCUMENT:
-{document_text}
-
-Extract specifically:
-- Actionable tasks
-- Owners (defaults to 'Unassigned')
-- deadlines
-- Dependencies
-- Priority (high/medium/low)
-
-LIMIT TO THE TOP 5 MOST CRITICAL ACTIONS ONLY.
-KEEP DESCRIPTIONS SHORT (under 15 words).
-Focus on high-impact items to ensure the response fits within limits.
-
-Remember to respond with a valid JSON array of action items."""
-        
-        if context:
-            prompt += f"""
-
-ADDITIONAL CONTEXT (from summary):
-{json.dumps(context, indent=2)}
-
-Use this context to better understand the document's intent and identify implicit actions."""
+        if self.cache:
+            cached, cache_probe = self.cache.lookup(
+                "action", self.model, document_text, context, self.client
+            )
+            if cached is not None:
+                logger.debug("Cache hit")
+                return cached
         
-        prompt += "\n\nRemember to respond with a valid JSON array of action items."
+        prompt = self._build_prompt(document_text, context, context_text)
         
         try:
-            print(f"[Action Agent] Making API call to model: {self.model}")
-            print(f"[Action Agent] Prompt length: {len(prompt)} characters")
-            print(f"[Action Agent] Context provided: {bool(context)}")
-            print(f"[Action Agent] Temperature: {self.temperature}, Max tokens: {self.max_tokens}")
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_MESSAGE},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
+            logger.debug(
+                "Making API call to model: %s (prompt length: %d characters, context provided: %s)",
+                self.model, len(prompt), bool(context)
             )
+            response = call_with_retry(self.client.chat.completions.create, **self._request_kwargs(prompt))
+            result = self._parse_response(response)
+            if self.cache:
+                self.cache.store(cache_probe, result)
+            return result
             
-            print(f"[Action Agent] Response object: {response}")
-            print(f"[Action Agent] Finish reason: {response.choices[0].finish_reason}")
-            
-            content = response.choices[0].message.content
-            print(f"[Action Agent] Content type: {type(content)}")
-            print(f"[Action Agent] Content is None: {content is None}")
-            print(f"[Action Agent] Received response: {content[:200] if content else 'EMPTY/NULL'}...")
+        except Exception as e:
+            logger.exception("Action extraction failed: %s", e)
+            return []
+    
+    async def aprocess_document(
+        self,
+        document_text: str,
+        context: Dict[str, Any] = None,
+        context_text: str = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of process_document using the AsyncOpenAI client
+        
+        Args:
+            document_text: The document text to analyze
+            context: Optional context from other agents (e.g., summary)
+            context_text: Optional pre-serialized context, shared across chunks
             
-            result = self._extract_json(content if content else "[]")
-            print(f"[Action Agent] Parsed {len(result)} action items")
+        Returns:
+            List of action items with metadata
+        """
+        if self.cache:
+            cached, cache_probe = await self.cache.alookup(
+                "action", self.model, document_text, context, self.aclient
+            )
+            if cached is not None:
+                logger.debug("Cache hit")
+                return cached
+        
+        prompt = self._build_prompt(document_text, context, context_text)
+        
+        try:
+            logger.debug("Making async API call to model: %s", self.model)
+            if self.stream:
+                result = [action async for action in self._astream_actions(prompt)]
+            else:
+                response = await self._acreate(prompt)
+                result = self._parse_response(response)
+            if self.cache:
+                self.cache.store(cache_probe, result)
             return result
             
         except Exception as e:
-            print(f"[Action Agent] ERROR: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Action extraction failed: %s", e)
             return []
     
+    async def astream_document(
+        self,
+        document_text: str,
+        context: Dict[str, Any] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream action items as soon as each one is complete in the response
+        
+        Args:
+            document_text: The document text to analyze
+            context: Optional context from other agents (e.g., summary)
+            
+        Yields:
+            Normalized action items in response order
+        """
+        prompt = self._build_prompt(document_text, context)
+        async for action in self._astream_actions(prompt):
+            yield action
+    
+    async def _astream_actions(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """Request a streamed completion and yield each action item once it closes"""
+        stream = await self._acreate(prompt, stream=True)
+        
+        scanner = JsonArrayItemScanner()
+        accumulator = JsonStreamAccumulator()
+        try:
+            async for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                delta = chunk.choices[0].delta.content
+                for item_text in scanner.feed(delta):
+                    try:
+                        action = fast_json.loads(item_text)
+                    except fast_json.JSONDecodeError:
+                        continue
+                    if isinstance(action, dict):
+                        yield self._normalize_action(action)
+                
+                # Stop reading once the array is complete; any trailing prose is unused
+                if accumulator.add(delta) is not None:
+                    break
+        finally:
+            await stream.close()
+    
     def process_chunks(self, chunks: List[Dict[str, Any]], context: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         Process multiple document chunks and combine action items
@@ -149,9 +464,11 @@ Use this context to better understand the document's intent and identify implici
             Combined list of action items from all chunks
         """
         all_actions = []
+        # The context is the same for every chunk, so serialize it once
+        context_text = self._format_context(context)
         
         for chunk in chunks:
-            actions = self.process_document(chunk["text"], context)
+            actions = self.process_document(chunk["text"], context, context_text)
             all_actions.extend(actions)
         
         # Deduplicate similar actions
@@ -159,73 +476,130 @@ Use this context to better understand the document's intent and identify implici
         
         return deduplicated
     
+    async def aprocess_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        context: Dict[str, Any] = None,
+        max_concurrency: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process multiple document chunks concurrently and combine action items
+        
+        Args:
+            chunks: List of document chunks with text
+            context: Optional context from other agents
+            max_concurrency: Maximum number of in-flight API calls
+            
+        Returns:
+            Combined list of action items from all chunks
+        """
+        sem = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        context_text = self._format_context(context)
+        
+        async def _one(chunk: Dict[str, Any]) -> List[Dict[str, Any]]:
+            async with sem:
+                return await self.aprocess_document(chunk["text"], context, context_text)
+        
+        results = await asyncio.gather(*[_one(chunk) for chunk in chunks])
+        
+        all_actions = []
+        for actions in results:
+            all_actions.extend(actions)
+        
+        deduplicated = self._deduplicate_actions(all_actions)
+        if self.semantic_dedup:
+            deduplicated = await self._asemantic_dedup(deduplicated)
+        return deduplicated
+    
     def _deduplicate_actions(self, actions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Remove duplicate or very similar action items"""
         if len(actions) <= 1:
             return actions
         
         unique_actions = []
-        seen_tasks = set()
+        seen_shingles = []
         
         for action in actions:
-            task_lower = action.get("task", "").lower().strip()
+            task = action.get("task", "")
+            if not task.strip():
+                continue
             
-            # Simple deduplication based on task similarity
-            if task_lower and task_lower not in seen_tasks:
-                seen_tasks.add(task_lower)
+            # Near-duplicate detection via word overlap between tasks
+            shingle_set = word_shingles(task)
+            if not is_near_duplicate(shingle_set, seen_shingles):
+                seen_shingles.append(shingle_set)
                 unique_actions.append(action)
         
         return unique_actions
     
+    async def _asemantic_dedup(self, actions: List[Dict[str, Any]], threshold: float = 0.9) -> List[Dict[str, Any]]:
+        """
+        Remove paraphrased action items that word-overlap matching misses, using task embeddings
+        
+        Falls back to the input unchanged if embeddings are unavailable.
+        """
+        if len(actions) <= 1:
+            return actions
+        
+        try:
+            response = await acall_with_retry(
+                self.aclient.embeddings.create,
+                model=AgentCache.EMBEDDING_MODEL,
+                input=[action["task"] for action in actions]
+            )
+        except Exception as e:
+            logger.warning("Embeddings unavailable, skipping semantic dedup: %s", e)
+            return actions
+        
+        embeddings = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        return [actions[i] for i in semantic_dedup_indices(embeddings, threshold)]
+    
     def _extract_json(self, content: str) -> List[Dict[str, Any]]:
         """Extract and parse JSON response"""
-        print(f"[Action Agent] _extract_json called with content length: {len(content)}")
-        print(f"[Action Agent] Content preview: {content[:300]}")
+        logger.debug("Extracting JSON from %d characters", len(content))
         
         try:
-            # Look for JSON in code blocks
-            if "```json" in content:
-                print("[Action Agent] Found ```json marker")
-                json_start = content.find("```json") + 7
-                json_end = content.find("```", json_start)
-                json_str = content[json_start:json_end].strip()
-            elif "```" in content:
-                print("[Action Agent] Found ``` marker")
-                json_start = content.find("```") + 3
-                json_end = content.find("```", json_start)
-                json_str = content[json_start:json_end].strip()
-            else:
-                # Try to find JSON array directly
-                print("[Action Agent] No code blocks, looking for JSON array")
-                json_start = content.find("[")
-                json_end = content.rfind("]") + 1
-                json_str = content[json_start:json_end]
+            result = self._load_json(content)
             
-            print(f"[Action Agent] Extracted JSON string: {json_str[:200]}")
-            result = json.loads(json_str)
-            print(f"[Action Agent] Successfully parsed JSON, type: {type(result)}")
+            # Structured outputs wrap the array in an object
+            if isinstance(result, dict) and isinstance(result.get("actions"), list):
+                result = result["actions"]
             
             # Ensure it's a list
             if not isinstance(result, list):
-                print(f"[Action Agent] Converting single object to list")
                 result = [result]
             
             # Validate and normalize each action item
-            normalized = []
-            for action in result:
-                if isinstance(action, dict):
-                    normalized.append({
-                        "task": action.get("task", "Unspecified task"),
-                        "owner": action.get("owner", "Not specified"),
-                        "deadline": action.get("deadline", "Not specified"),
-                        "dependencies": action.get("dependencies", []),
-                        "priority": action.get("priority", "medium"),
-                        "status": action.get("status", "pending")
-                    })
+            normalized = [
+                self._normalize_action(action)
+                for action in result
+                if isinstance(action, dict)
+            ]
             
-            print(f"[Action Agent] Returning {len(normalized)} normalized actions")
+            logger.debug("Returning %d normalized actions", len(normalized))
             return normalized
             
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"[Action Agent] JSON parsing failed: {str(e)}")
+        except (fast_json.JSONDecodeError, ValueError) as e:
+            logger.debug("JSON parsing failed: %s", e)
             return []
+    
+    def _load_json(self, content: str) -> Any:
+        """Parse the response, scanning for fenced or embedded JSON unless it is schema-constrained"""
+        if self.structured_output:
+            try:
+                return fast_json.loads(content)
+            except fast_json.JSONDecodeError:
+                # Providers without structured-output support ignore response_format
+                pass
+        return extract_json(content)
+    
+    def _normalize_action(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        """Fill in defaults for a single parsed action item"""
+        return {
+            "task": action.get("task", "Unspecified task"),
+            "owner": action.get("owner", "Not specified"),
+            "deadline": action.get("deadline", "Not specified"),
+            "dependencies": action.get("dependencies", []),
+            "priority": action.get("priority", "medium"),
+            "status": action.get("status", "pending")
+        }
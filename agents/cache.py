@@ -0,0 +1,230 @@
+"""
+Agent Result Cache
+Two-tier cache (exact hash + embedding similarity) for agent outputs
+"""
+from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import numpy as np
+from utils.retry import acall_with_retry, call_with_retry
+
+logger = logging.getLogger(__name__)
+
+
+def _context_text(context: Optional[Dict[str, Any]]) -> str:
+    """Serialize agent context deterministically (empty when there is none)"""
+    return json.dumps(context, sort_keys=True) if context else ""
+
+
+def _digest(*parts: str) -> str:
+    """Hash strings joined by NUL separators"""
+    return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+
+class AgentCache:
+    """
+    Caches agent results by exact document hash and by semantic similarity
+
+    One cache is shared by every app session, so entries are only touched
+    under a lock; embedding requests and similarity math run outside it.
+    """
+
+    EMBEDDING_MODEL = "text-embedding-3-small"
+
+    # After an embeddings error, semantic lookups are skipped for this long
+    EMBEDDING_RETRY_SECONDS = 60.0
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        similarity_threshold: float = 0.95,
+        max_entries: int = 1024
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            ttl_seconds: How long an entry stays valid
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            max_entries: Maximum number of cached results (oldest evicted first)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+
+        # key -> (timestamp, namespace, embedding or None, value)
+        self._entries: Dict[str, Tuple[float, Tuple[str, ...], Optional[np.ndarray], Any]] = {}
+        self._lock = threading.Lock()
+        self._embeddings_retry_at = 0.0
+
+    @staticmethod
+    def make_key(agent_name: str, model: str, document_text: str, context: Dict[str, Any] = None) -> str:
+        """Build the exact-match key for an agent call"""
+        return _digest(agent_name, model, document_text, _context_text(context))
+
+    def lookup(
+        self,
+        agent_name: str,
+        model: str,
+        document_text: str,
+        context: Dict[str, Any],
+        client
+    ) -> Tuple[Optional[Any], Dict[str, Any]]:
+        """
+        Look up a cached result, trying an exact match then a semantic match
+
+        Args:
+            agent_name: Name of the calling agent
+            model: Model used by the agent
+            document_text: The document text being processed
+            context: Optional context passed to the agent
+            client: OpenAI client used to embed the document on exact misses
+
+        Returns:
+            Tuple of (cached result or None, probe to pass to store on a miss)
+        """
+        probe = self._new_probe(agent_name, model, document_text, context)
+
+        cached = self._get(probe["key"])
+        if cached is not None:
+            return cached, probe
+
+        if self._embeddings_due():
+            try:
+                response = call_with_retry(
+                    client.embeddings.create, model=self.EMBEDDING_MODEL, input=document_text
+                )
+                probe["embedding"] = self._normalize(response.data[0].embedding)
+            except Exception as e:
+                self._embeddings_failed(e)
+
+        return self._search(probe), probe
+
+    async def alookup(
+        self,
+        agent_name: str,
+        model: str,
+        document_text: str,
+        context: Dict[str, Any],
+        aclient
+    ) -> Tuple[Optional[Any], Dict[str, Any]]:
+        """Async variant of lookup using an AsyncOpenAI client for embeddings"""
+        probe = self._new_probe(agent_name, model, document_text, context)
+
+        cached = self._get(probe["key"])
+        if cached is not None:
+            return cached, probe
+
+        if self._embeddings_due():
+            try:
+                response = await acall_with_retry(
+                    aclient.embeddings.create, model=self.EMBEDDING_MODEL, input=document_text
+                )
+                probe["embedding"] = self._normalize(response.data[0].embedding)
+            except Exception as e:
+                self._embeddings_failed(e)
+
+        return self._search(probe), probe
+
+    def _embeddings_due(self) -> bool:
+        """Whether embeddings may be requested (not within the cooldown after an error)"""
+        return time.monotonic() >= self._embeddings_retry_at
+
+    def _embeddings_failed(self, error: Exception):
+        """Skip semantic lookups for a while after an embeddings error"""
+        logger.warning(
+            "Embeddings unavailable, semantic cache paused for %.0fs: %s", self.EMBEDDING_RETRY_SECONDS, error
+        )
+        self._embeddings_retry_at = time.monotonic() + self.EMBEDDING_RETRY_SECONDS
+
+    def _new_probe(
+        self,
+        agent_name: str,
+        model: str,
+        document_text: str,
+        context: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build the lookup probe for an agent call"""
+        context_text = _context_text(context)
+        return {
+            "key": _digest(agent_name, model, document_text, context_text),
+            # Semantic matches are only served for the same agent, model and context
+            "namespace": (agent_name, model, _digest(context_text)),
+            "embedding": None
+        }
+
+    def store(self, probe: Dict[str, Any], value: Any):
+        """Store a result under the probe returned by lookup"""
+        entry = (time.monotonic(), probe["namespace"], probe["embedding"], copy.deepcopy(value))
+        with self._lock:
+            self._entries.pop(probe["key"], None)
+            self._entries[probe["key"]] = entry
+
+            # Dicts preserve insertion order, so the first key is the oldest
+            while len(self._entries) > self.max_entries:
+                del self._entries[next(iter(self._entries))]
+
+    def clear(self):
+        """Remove all cached results"""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, key: str) -> Optional[Any]:
+        """Return an unexpired exact-match result"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._is_expired(entry[0]):
+                del self._entries[key]
+                return None
+        return copy.deepcopy(entry[3])
+
+    def _search(self, probe: Dict[str, Any]) -> Optional[Any]:
+        """Return the most similar unexpired result above the similarity threshold"""
+        if probe["embedding"] is None:
+            return None
+
+        with self._lock:
+            self._evict_expired()
+            candidates: List[Tuple[np.ndarray, Any]] = [
+                (embedding, value)
+                for _, namespace, embedding, value in self._entries.values()
+                if namespace == probe["namespace"] and embedding is not None
+            ]
+        if not candidates:
+            return None
+
+        similarities = np.stack([embedding for embedding, _ in candidates]) @ probe["embedding"]
+        best = int(np.argmax(similarities))
+        if similarities[best] >= self.similarity_threshold:
+            return copy.deepcopy(candidates[best][1])
+        return None
+
+    def _evict_expired(self):
+        """Drop entries older than the TTL (the caller holds the lock)"""
+        expired = [key for key, entry in self._entries.items() if self._is_expired(entry[0])]
+        for key in expired:
+            del self._entries[key]
+
+    def _is_expired(self, timestamp: float) -> bool:
+        """Check whether an entry timestamp is older than the TTL"""
+        return time.monotonic() - timestamp > self.ttl_seconds
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """L2-normalize an embedding so dot products are cosine similarities"""
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+@lru_cache(maxsize=None)
+def get_agent_cache(ttl_seconds: float = 3600, similarity_threshold: float = 0.95) -> AgentCache:
+    """Get the process-wide cache shared by all agents with the same settings"""
+    return AgentCache(ttl_seconds=ttl_seconds, similarity_threshold=similarity_threshold)
@@ -2,12 +2,18 @@
 Document Orchestrator
 Central coordination layer for managing multi-agent document processing
 """
-from typing import Dict, Any, List, Callable
+import asyncio
+import hashlib
+import json
+import time
+from typing import Dict, Any, List, Callable, Awaitable, Optional
 from .summary_agent import SummaryAgent
 from .action_agent import ActionAgent
 from .risk_agent import RiskAgent
 from utils.document_processor import DocumentProcessor
+from utils.compress import compress
 from utils.config import Config
+from utils.retry import call_with_retry
 
 
 class DocumentOrchestrator:
@@ -31,8 +37,8 @@ class DocumentOrchestrator:
         self.action_agent = ActionAgent(config.get_agent_config("action"))
         self.risk_agent = RiskAgent(config.get_agent_config("risk"))
         
-        # Processing state
-        self.current_status = {}
+        # The app shares one orchestrator across sessions, so no per-run state
+        # is kept here; each run reports status through its own progress_callback
     
     def process_document(
         self, 
@@ -42,6 +48,26 @@ class DocumentOrchestrator:
         """
         Process a document through all agents with coordination
         
+        Args:
+            document_text: The document text to process
+            progress_callback: Optional callback for progress updates (agent_name, status)
+            
+        Returns:
+            Dictionary with results from all agents
+        """
+        return asyncio.run(self.aprocess_document(document_text, progress_callback))
+    
+    async def aprocess_document(
+        self, 
+        document_text: str,
+        progress_callback: Callable[[str, str], None] = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of process_document
+        
+        The Summary Agent runs first; the Action and Risk agents only depend
+        on the summary, so they run concurrently once it is available.
+        
         Args:
             document_text: The document text to process
             progress_callback: Optional callback for progress updates (agent_name, status)
@@ -52,71 +78,415 @@ class DocumentOrchestrator:
         # Step 1: Process and chunk the document
         self._update_status("preprocessing", "processing", progress_callback)
         processed_doc = self.document_processor.process_document(document_text)
-        chunks = processed_doc["chunks"]
+        chunks = self._unique_chunks(processed_doc["chunks"])
+        
+        # Short documents can be handled by one fused request instead of three
+        if self.config.fused_mode and len(chunks) == 1:
+            fused = await self._afused(chunks[0]["text"], progress_callback)
+            if fused is not None:
+                fused["metadata"] = self._build_metadata(processed_doc)
+                return fused
         
         # Step 2: Summary Agent (runs first to provide context)
         self._update_status("summary", "processing", progress_callback)
-        if len(chunks) == 1:
-            summary_result = self.summary_agent.process_document(chunks[0]["text"])
-        else:
-            summary_result = self.summary_agent.process_chunks(chunks)
+        summary_result = await self._asummarize(chunks)
         self._update_status("summary", "complete", progress_callback)
         
-        # Step 3: Action Agent (uses summary as context)
-        self._update_status("action", "processing", progress_callback)
-        context = {
-            "summary": summary_result.get("summary", ""),
-            "intent": summary_result.get("intent", ""),
-            "key_decisions": summary_result.get("key_decisions", [])
-        }
-        
-        if len(chunks) == 1:
-            action_result = self.action_agent.process_document(chunks[0]["text"], context)
-        else:
-            action_result = self.action_agent.process_chunks(chunks, context)
-        self._update_status("action", "complete", progress_callback)
-        
-        # Step 4: Risk Agent (uses summary and actions as context)
-        self._update_status("risk", "processing", progress_callback)
-        risk_context = {
-            **context,
-            "action_items": action_result
-        }
+        # Step 3: Action and Risk Agents (both use the summary as context)
+        action_call, risk_call = self._downstream_calls(
+            self._compress_chunks(chunks),
+            self._build_context(summary_result),
+            run_risk=self._needs_risk_analysis(processed_doc)
+        )
         
-        if len(chunks) == 1:
-            risk_result = self.risk_agent.process_document(chunks[0]["text"], risk_context)
-        else:
-            risk_result = self.risk_agent.process_chunks(chunks, risk_context)
-        self._update_status("risk", "complete", progress_callback)
+        action_result, risk_result = await asyncio.gather(
+            self._run_agent("action", action_call, progress_callback),
+            self._run_agent("risk", risk_call, progress_callback)
+        )
         
         # Aggregate results
         return {
             "summary": summary_result,
             "actions": action_result,
             "risks": risk_result,
-            "metadata": {
-                "document_length": processed_doc["metadata"]["total_words"],
-                "total_tokens": processed_doc["metadata"]["total_tokens"],
-                "num_chunks": processed_doc["num_chunks"],
-                "chunking_required": processed_doc["requires_chunking"]
+            "metadata": self._build_metadata(processed_doc)
+        }
+    
+    async def aprocess_document_streaming(
+        self,
+        document_text: str,
+        progress_callback: Callable[[str, str], None] = None
+    ) -> Dict[str, Any]:
+        """
+        Start processing a document and return the agent results as tasks
+        
+        Callers can await each result independently, e.g. render the summary
+        while the Action and Risk agents are still running. Must be called
+        from a running event loop; the tasks run on that loop.
+        
+        Args:
+            document_text: The document text to process
+            progress_callback: Optional callback for progress updates (agent_name, status)
+            
+        Returns:
+            Dictionary with "summary", "actions" and "risks" asyncio.Tasks and
+            the (already computed) "metadata"
+        """
+        self._update_status("preprocessing", "processing", progress_callback)
+        processed_doc = self.document_processor.process_document(document_text)
+        chunks = self._unique_chunks(processed_doc["chunks"])
+        downstream_chunks = self._compress_chunks(chunks)
+        run_risk = self._needs_risk_analysis(processed_doc)
+        
+        summary_task = asyncio.create_task(
+            self._run_agent("summary", self._asummarize(chunks), progress_callback)
+        )
+        
+        async def _actions() -> List[Dict[str, Any]]:
+            context = self._build_context(await summary_task)
+            return await self._run_agent(
+                "action", self._action_call(downstream_chunks, context), progress_callback
+            )
+        
+        async def _risks() -> Dict[str, Any]:
+            context = self._build_context(await summary_task)
+            return await self._run_agent(
+                "risk", self._risk_call(downstream_chunks, context, run_risk), progress_callback
+            )
+        
+        return {
+            "summary": summary_task,
+            "actions": asyncio.create_task(_actions()),
+            "risks": asyncio.create_task(_risks()),
+            "metadata": self._build_metadata(processed_doc)
+        }
+    
+    async def aprocess_documents(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Process several documents concurrently as one Summary -> {Action, Risk} DAG
+        
+        Summaries for all documents run concurrently; once they are all
+        available, every Action and Risk call is fired in a single gather, so
+        wall-clock time approaches two LLM round trips regardless of the
+        number of documents (within rate limits).
+        
+        Args:
+            texts: List of document texts to process
+            
+        Returns:
+            List of result dictionaries, one per document, in input order
+        """
+        processed_docs = [self.document_processor.process_document(text) for text in texts]
+        doc_chunks = [self._unique_chunks(processed_doc["chunks"]) for processed_doc in processed_docs]
+        
+        # Phase 1: summaries for every document
+        summaries = await asyncio.gather(*[self._asummarize(chunks) for chunks in doc_chunks])
+        
+        # Phase 2: actions and risks for every document in one gather
+        calls = []
+        for processed_doc, chunks, summary_result in zip(processed_docs, doc_chunks, summaries):
+            calls.extend(self._downstream_calls(
+                self._compress_chunks(chunks),
+                self._build_context(summary_result),
+                run_risk=self._needs_risk_analysis(processed_doc)
+            ))
+        downstream = await asyncio.gather(*calls)
+        
+        return [
+            {
+                "summary": summary_result,
+                "actions": downstream[2 * doc_id],
+                "risks": downstream[2 * doc_id + 1],
+                "metadata": self._build_metadata(processed_doc)
             }
+            for doc_id, (processed_doc, summary_result) in enumerate(zip(processed_docs, summaries))
+        ]
+    
+    def process_document_batch(
+        self,
+        docs: List[str],
+        poll_interval: float = 30.0
+    ) -> List[Dict[str, Any]]:
+        """
+        Process several documents through the OpenAI Batch API
+        
+        Trades latency (up to 24h) for lower token cost on bulk/offline runs.
+        Summaries are submitted as a first batch; the Action and Risk prompts,
+        which need the summary as context, are submitted as a second batch.
+        Multi-chunk summaries are merged locally instead of synthesized.
+        
+        Args:
+            docs: List of document texts to process
+            poll_interval: Seconds to wait between batch status checks
+            
+        Returns:
+            List of result dictionaries, one per document, in input order
+        """
+        processed_docs = [self.document_processor.process_document(doc) for doc in docs]
+        doc_chunks = [self._unique_chunks(processed_doc["chunks"]) for processed_doc in processed_docs]
+        
+        # Phase 1: summaries for every chunk of every document
+        summary_requests = {}
+        for doc_id, chunks in enumerate(doc_chunks):
+            for chunk in chunks:
+                prompt = self.summary_agent._build_prompt(chunk["text"])
+                summary_requests[f"{doc_id}:{chunk['chunk_id']}:summary"] = self._batch_body(
+                    self.summary_agent, prompt
+                )
+        summary_contents = self._run_batch(summary_requests, poll_interval)
+        
+        summaries = []
+        for doc_id, chunks in enumerate(doc_chunks):
+            chunk_summaries = [
+                self.summary_agent._extract_json(
+                    summary_contents.get(f"{doc_id}:{chunk['chunk_id']}:summary", "")
+                )
+                for chunk in chunks
+            ]
+            if len(chunk_summaries) == 1:
+                summaries.append(chunk_summaries[0])
+            else:
+                summaries.append(self.summary_agent._merge_summaries(chunk_summaries))
+        
+        # Phase 2: actions and risks for every chunk, using the summaries as context
+        downstream_requests = {}
+        for doc_id, chunks in enumerate(doc_chunks):
+            context = self._build_context(summaries[doc_id])
+            for chunk in chunks:
+                custom_id = f"{doc_id}:{chunk['chunk_id']}"
+                downstream_requests[f"{custom_id}:action"] = self._batch_body(
+                    self.action_agent, self.action_agent._build_prompt(chunk["text"], context)
+                )
+                downstream_requests[f"{custom_id}:risk"] = self._batch_body(
+                    self.risk_agent, self.risk_agent._build_prompt(chunk["text"], context)
+                )
+        downstream_contents = self._run_batch(downstream_requests, poll_interval)
+        
+        results = []
+        for doc_id, processed_doc in enumerate(processed_docs):
+            all_actions = []
+            risk_results = []
+            for chunk in doc_chunks[doc_id]:
+                custom_id = f"{doc_id}:{chunk['chunk_id']}"
+                all_actions.extend(self.action_agent._extract_json(
+                    downstream_contents.get(f"{custom_id}:action") or "[]"
+                ))
+                risk_results.append(self.risk_agent._extract_json(
+                    downstream_contents.get(f"{custom_id}:risk", "")
+                ))
+            
+            results.append({
+                "summary": summaries[doc_id],
+                "actions": self.action_agent._deduplicate_actions(all_actions),
+                "risks": self.risk_agent._merge_results(risk_results),
+                "metadata": self._build_metadata(processed_doc)
+            })
+        
+        return results
+    
+    async def _afused(
+        self,
+        document_text: str,
+        progress_callback: Callable[[str, str], None] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run the summary, action and risk tasks as a single request
+        
+        Returns:
+            Dictionary with "summary", "actions" and "risks", or None if the
+            fused request did not produce a usable result
+        """
+        for agent_name in ("summary", "action", "risk"):
+            self._update_status(agent_name, "processing", progress_callback)
+        
+        fused = await self.summary_agent.aprocess_document_fused(document_text)
+        if fused is None:
+            return None
+        
+        actions = [
+            self.action_agent._normalize_action(action)
+            for action in fused["actions"]
+            if isinstance(action, dict)
+        ]
+        result = {
+            "summary": fused["summary"],
+            "actions": self.action_agent._deduplicate_actions(actions),
+            "risks": self.risk_agent._normalize_result(fused["risks"])
+        }
+        for agent_name in ("summary", "action", "risk"):
+            self._update_status(agent_name, "complete", progress_callback)
+        return result
+    
+    async def _asummarize(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Run the Summary Agent over a document's chunks"""
+        return await self.summary_agent.aprocess_chunks(chunks)
+    
+    def _compress_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Extractively compress chunk text for the Action and Risk agents
+        
+        Each chunk is otherwise sent whole to every agent; the Summary Agent
+        keeps the full text.
+        """
+        ratio = self.config.compress_ratio
+        if ratio >= 1.0:
+            return chunks
+        return [{**chunk, "text": compress(chunk["text"], ratio)} for chunk in chunks]
+    
+    def _needs_risk_analysis(self, processed_doc: Dict[str, Any]) -> bool:
+        """
+        Decide whether a document is worth a Risk Agent call
+        
+        Short documents with no questions and no risk-related wording
+        typically come back with empty risk lists, so they are skipped.
+        """
+        min_words = self.config.risk_min_words
+        if not min_words or processed_doc["metadata"]["total_words"] >= min_words:
+            return True
+        text = processed_doc["cleaned_text"].lower()
+        return "?" in text or any(keyword in text for keyword in self.config.risk_keywords)
+    
+    async def _skipped_risk(self) -> Dict[str, Any]:
+        """Stand-in for the Risk Agent call on documents triaged as low-value"""
+        return self.risk_agent._empty_result()
+    
+    def _downstream_calls(
+        self,
+        chunks: List[Dict[str, Any]],
+        context: Dict[str, Any],
+        run_risk: bool = True
+    ) -> tuple[Awaitable[Any], Awaitable[Any]]:
+        """Build the (action, risk) agent calls for a document's chunks"""
+        return self._action_call(chunks, context), self._risk_call(chunks, context, run_risk)
+    
+    def _action_call(self, chunks: List[Dict[str, Any]], context: Dict[str, Any]) -> Awaitable[Any]:
+        """Build the Action Agent call for a document's chunks"""
+        if len(chunks) == 1:
+            return self.action_agent.aprocess_document(chunks[0]["text"], context)
+        return self.action_agent.aprocess_chunks(chunks, context)
+    
+    def _risk_call(
+        self,
+        chunks: List[Dict[str, Any]],
+        context: Dict[str, Any],
+        run_risk: bool = True
+    ) -> Awaitable[Any]:
+        """Build the Risk Agent call for a document's chunks"""
+        if not run_risk:
+            return self._skipped_risk()
+        if len(chunks) == 1:
+            return self.risk_agent.aprocess_document(chunks[0]["text"], context)
+        return self.risk_agent.aprocess_chunks(chunks, context)
+    
+    def _batch_body(self, agent: Any, prompt: str) -> Dict[str, Any]:
+        """Build a chat completion request body for a batch line"""
+        return agent._request_kwargs(prompt)
+    
+    def _run_batch(self, requests: Dict[str, Dict[str, Any]], poll_interval: float) -> Dict[str, str]:
+        """
+        Submit chat completion requests as one batch and wait for the results
+        
+        Args:
+            requests: Mapping of custom_id to request body
+            poll_interval: Seconds to wait between batch status checks
+            
+        Returns:
+            Mapping of custom_id to response message content
+        """
+        client = self.summary_agent.client
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body
+            })
+            for custom_id, body in requests.items()
+        ]
+        batch_file = call_with_retry(
+            client.files.create,
+            file=("batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = call_with_retry(
+            client.batches.create,
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            batch = call_with_retry(client.batches.retrieve, batch.id)
+        
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch.id} did not complete (status: {batch.status})")
+        
+        contents = {}
+        output = call_with_retry(client.files.content, batch.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            body = (item.get("response") or {}).get("body") or {}
+            choices = body.get("choices") or []
+            contents[item["custom_id"]] = (choices[0]["message"].get("content") or "") if choices else ""
+        
+        return contents
+    
+    def _unique_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop chunks whose text repeats an earlier chunk
+        
+        Repeated boilerplate (headers, footers, legal text) would otherwise
+        cost one LLM call per agent for every copy.
+        """
+        unique = {}
+        for chunk in chunks:
+            digest = hashlib.blake2b(chunk["text"].encode("utf-8"), digest_size=16).digest()
+            if digest not in unique:
+                unique[digest] = chunk
+        return list(unique.values())
+    
+    def _build_context(self, summary_result: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the context passed from the Summary Agent to downstream agents"""
+        return {
+            "summary": summary_result.get("summary", ""),
+            "intent": summary_result.get("intent", ""),
+            "key_decisions": summary_result.get("key_decisions", [])
+        }
+    
+    def _build_metadata(self, processed_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the result metadata for a processed document"""
+        return {
+            "document_length": processed_doc["metadata"]["total_words"],
+            "total_tokens": processed_doc["metadata"]["total_tokens"],
+            "num_chunks": processed_doc["num_chunks"],
+            "chunking_required": processed_doc["requires_chunking"]
         }
     
+    async def _run_agent(
+        self,
+        agent_name: str,
+        call: Awaitable[Any],
+        callback: Callable[[str, str], None] = None
+    ) -> Any:
+        """Await an agent call, reporting its processing/complete status"""
+        self._update_status(agent_name, "processing", callback)
+        result = await call
+        self._update_status(agent_name, "complete", callback)
+        return result
+    
     def _update_status(
         self, 
         agent_name: str, 
         status: str, 
         callback: Callable[[str, str], None] = None
     ):
-        """Update processing status and call callback if provided"""
-        self.current_status[agent_name] = status
+        """Report a status change to the run's callback, if provided"""
         if callback:
             callback(agent_name, status)
     
-    def get_status(self) -> Dict[str, str]:
-        """Get current processing status of all agents"""
-        return self.current_status.copy()
-    
     def validate_configuration(self) -> tuple[bool, str]:
         """
         Validate that the orchestrator is properly configured
@@ -2,9 +2,62 @@
 Risk & Open-Issues Agent
 Identifies unresolved questions, missing data, assumptions, and potential risks
 """
-from openai import OpenAI
+from openai import AsyncOpenAI
 from typing import Dict, Any, List
-import json
+from utils.openai_client import get_client, get_async_client
+from utils.ratelimit import acreate_limited, get_rate_limiter
+from utils.retry import call_with_retry
+from utils import fast_json
+from utils.prompt_caching import build_system_message, uses_automatic_caching
+from utils.dedup import word_shingles, is_near_duplicate, ordered_dedup
+from utils.streaming import JsonStreamAccumulator, extract_json
+from utils.structured_output import enum_string, json_schema_format, strict_object, string_array
+from .cache import get_agent_cache
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Static prompt templates, kept as constants so the head of every user prompt
+# is byte-identical and only the document/context slots vary.
+_RISK_USER_TEMPLATE = """Please analyze the following document and identify all risks, open questions, and assumptions:
+
+DOCUMENT:
+{document}
+{context}
+Extract specifically:
+1. Potential risks (severity: high/medium/low)
+2. Open questions/ambiguities
+3. Missing information
+4. Key assumptions made
+
+LIMIT TO THE TOP 5 MOST CRITICAL RISKS ONLY. BE CONCISE.
+Focus on high-impact items to ensure the response fits within limits.
+
+Remember to respond with a valid JSON object containing open_questions, assumptions, missing_data, and risks."""
+
+_RISK_CONTEXT_BLOCK = """
+ADDITIONAL CONTEXT:
+{context}
+
+Use this context to identify risks related to the summary insights.
+"""
+
+_RISK_RESPONSE_FORMAT = json_schema_format("risk_analysis", strict_object({
+    "open_questions": string_array(),
+    "assumptions": string_array(),
+    "missing_data": string_array(),
+    "risks": {
+        "type": "array",
+        "items": strict_object({
+            "title": {"type": "string"},
+            "description": {"type": "string"},
+            "severity": enum_string(["high", "medium", "low"]),
+            "type": enum_string(["technical", "resource", "timeline", "scope", "dependency", "other"]),
+            "mitigation": {"type": "string"}
+        })
+    }
+}))
 
 
 class RiskAgent:
@@ -65,6 +118,110 @@ Look for:
 
 Be thorough and think critically. It's better to flag potential issues than miss them."""
     
+    # Fixed worked example appended to the system message for OpenAI models so
+    # the static prefix exceeds the 1024-token automatic prompt-caching threshold
+    # (about 1.26k tokens measured; tests/test_prompt_caching.py keeps a margin)
+    FEW_SHOT_EXAMPLES = """
+
+EXAMPLE 1
+Document excerpt:
+"We plan to migrate the billing service to the new cloud region by June 30. The migration assumes the
+data team finishes the schema cleanup in May. Traffic projections for Q3 are not available yet. Legal
+has not confirmed whether customer invoices can be stored outside the EU. The vendor's SDK is in beta,
+but we will rely on it for payment retries. Two of the four backend engineers are on leave in June."
+
+Expected response:
+{
+    "open_questions": [
+        "Can customer invoices be stored outside the EU?",
+        "What is the rollback plan if the migration misses June 30?"
+    ],
+    "assumptions": [
+        "The data team will finish the schema cleanup in May",
+        "The beta vendor SDK will be stable enough for payment retries"
+    ],
+    "missing_data": [
+        "Q3 traffic projections",
+        "Legal confirmation on invoice data residency"
+    ],
+    "risks": [
+        {
+            "title": "Data residency compliance",
+            "description": "Storing invoices in the new region may violate EU data residency requirements; legal has not confirmed.",
+            "severity": "high",
+            "type": "scope",
+            "mitigation": "Obtain legal sign-off before migrating invoice storage"
+        },
+        {
+            "title": "Reduced engineering capacity in June",
+            "description": "Half of the backend team is on leave during the final migration month.",
+            "severity": "high",
+            "type": "resource",
+            "mitigation": "Move critical migration steps earlier or secure temporary staffing"
+        },
+        {
+            "title": "Dependency on beta SDK",
+            "description": "Payment retries rely on a vendor SDK that is still in beta and may change or fail.",
+            "severity": "medium",
+            "type": "dependency",
+            "mitigation": "Keep the current retry path as a fallback until the SDK is GA"
+        },
+        {
+            "title": "Schema cleanup slipping",
+            "description": "The migration date depends on the data team finishing schema cleanup in May.",
+            "severity": "medium",
+            "type": "timeline",
+            "mitigation": "Track schema cleanup as a milestone with an explicit go/no-go date"
+        },
+        {
+            "title": "Unknown Q3 load",
+            "description": "Without traffic projections the new region may be under-provisioned.",
+            "severity": "low",
+            "type": "technical",
+            "mitigation": "To be determined"
+        }
+    ]
+}
+
+EXAMPLE 2
+Document excerpt:
+"Marketing wants the pricing page redesign live before the October campaign. The copy is final, but the
+new plan tiers still need sign-off from finance. We will reuse the existing checkout flow, which we assume
+can handle annual billing without changes. Analytics events for the page have not been specified."
+
+Expected response:
+{
+    "open_questions": [
+        "When will finance sign off on the new plan tiers?"
+    ],
+    "assumptions": [
+        "The existing checkout flow supports annual billing without changes"
+    ],
+    "missing_data": [
+        "Analytics event specification for the redesigned page",
+        "Exact launch date of the October campaign"
+    ],
+    "risks": [
+        {
+            "title": "Pricing tiers not approved in time",
+            "description": "The redesign cannot launch until finance signs off on the plan tiers, and no date is set.",
+            "severity": "high",
+            "type": "timeline",
+            "mitigation": "Agree a sign-off deadline with finance ahead of the campaign"
+        },
+        {
+            "title": "Checkout may not support annual billing",
+            "description": "Reusing the current checkout assumes annual billing works unchanged; this is untested.",
+            "severity": "medium",
+            "type": "technical",
+            "mitigation": "Test an annual purchase end to end before launch"
+        }
+    ]
+}
+
+Note how each open question, assumption, and missing item is traced to a specific statement in the
+document, and how every risk carries a severity, a type, and a concrete mitigation when one is obvious."""
+    
     def __init__(self, llm_config: Dict[str, Any]):
         """
         Initialize the Risk Agent
@@ -74,85 +231,192 @@ Be thorough and think critically. It's better to flag potential issues than miss
         """
         config = llm_config["config_list"][0]
         
-        # Initialize OpenAI client with optional base_url for OpenRouter
-        client_kwargs = {"api_key": config["api_key"]}
-        if "base_url" in config:
-            client_kwargs["base_url"] = config["base_url"]
-        
-        self.client = OpenAI(**client_kwargs)
+        # Shared OpenAI client with optional base_url for OpenRouter
+        self.api_key = config["api_key"]
+        self.base_url = config.get("base_url")
+        self.client = get_client(self.api_key, self.base_url)
         self.model = config["model"]
         self.temperature = llm_config.get("temperature", 0.7)
         self.max_tokens = llm_config.get("max_tokens", 4096)
+        
+        # Byte-identical across calls so the provider can cache the prefix
+        self.system_prompt = self.SYSTEM_MESSAGE
+        if uses_automatic_caching(self.model):
+            self.system_prompt += self.FEW_SHOT_EXAMPLES
+        self.max_concurrency = llm_config.get("max_concurrency", 8)
+        self.stream = llm_config.get("stream", False)
+        self.structured_output = llm_config.get("structured_output", False)
+        self.rate_limiter = get_rate_limiter(
+            self.api_key, self.model, llm_config.get("rate_limit_rpm", 0), llm_config.get("rate_limit_tpm", 0)
+        )
+        self.cache = get_agent_cache(llm_config.get("cache_ttl", 3600)) if llm_config.get("enable_cache") else None
+    
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """Async client shared across agents on the running event loop"""
+        return get_async_client(self.api_key, self.base_url)
+    
+    def _format_context(self, context: Dict[str, Any] = None) -> str:
+        """Serialize context for the prompt (empty when there is none)"""
+        return fast_json.dumps(context, indent=True) if context else ""
+    
+    def _build_prompt(
+        self,
+        document_text: str,
+        context: Dict[str, Any] = None,
+        context_text: str = None
+    ) -> str:
+        """Build the user prompt for a document and optional (pre-serialized) context"""
+        if context_text is None:
+            context_text = self._format_context(context)
+        context_block = _RISK_CONTEXT_BLOCK.format(context=context_text) if context_text else ""
+        return _RISK_USER_TEMPLATE.format(document=document_text, context=context_block)
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, Any]]:
+        """Build the chat messages for a prompt, keeping the static system message first"""
+        return [
+            build_system_message(self.system_prompt, self.model),
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _request_kwargs(self, prompt: str) -> Dict[str, Any]:
+        """Build the chat completion arguments for a prompt"""
+        kwargs = {
+            "model": self.model,
+            "messages": self._build_messages(prompt),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if self.structured_output:
+            kwargs["response_format"] = _RISK_RESPONSE_FORMAT
+        return kwargs
+    
+    async def _acreate(self, prompt: str, **kwargs) -> Any:
+        """Send a chat completion request (with retries) once the shared rate limit allows it"""
+        return await acreate_limited(
+            self.aclient.chat.completions,
+            self.rate_limiter,
+            len(prompt) // 4,
+            **self._request_kwargs(prompt),
+            **kwargs
+        )
+    
+    def _parse_response(self, response) -> Dict[str, Any]:
+        """Extract the risk analysis from a chat completion response"""
+        content = response.choices[0].message.content
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received response: %s...", content[:200] if content else "EMPTY/NULL")
+        result = self._extract_json(content if content else "")
+        logger.debug("Parsed result with %d risks", len(result.get("risks", [])))
+        return result
+    
+    def _empty_result(self) -> Dict[str, Any]:
+        """Return an empty risk analysis"""
+        return {
+            "open_questions": [],
+            "assumptions": [],
+            "missing_data": [],
+            "risks": []
+        }
     
     def process_document(
         self, 
         document_text: str, 
-        context: Dict[str, Any] = None
+        context: Dict[str, Any] = None,
+        context_text: str = None
     ) -> Dict[str, Any]:
         """
         Process a document and identify risks and open issues
         
         Args:
             document_text: The document text to analyze
-            context: Optional context from other agents (summary, actions)
+            context: Optional context from the Summary Agent
+            context_text: Optional pre-serialized context, shared across chunks
             
         Returns:
             Dictionary with open questions, assumptions, and risks
         """
-        prompt = f"""Please analyze the following document and identify all risks, open questions, and assumptions:
-
-DOCUMENT:
-{document_text}
-"""
-        
-        if context:
-            prompt += f"""
-ADDITIONAL CONTEXT:
-{json.dumps(context, indent=2)}
-
-Use this context to identify risks related to the summary insights and action items.
-"""
+        if self.cache:
+            cached, cache_probe = self.cache.lookup(
+                "risk", self.model, document_text, context, self.client
+            )
+            if cached is not None:
+                logger.debug("Cache hit")
+                return cached
         
-        prompt += """
-Extract specifically:
-1. Potential risks (severity: high/medium/low)
-2. Open questions/ambiguities
-3. Missing information
-4. Key assumptions made
-
-LIMIT TO THE TOP 5 MOST CRITICAL RISKS ONLY. BE CONCISE.
-Focus on high-impact items to ensure the response fits within limits.
-
-Remember to respond with a valid JSON object containing open_questions, assumptions, missing_data, and risks."""
+        prompt = self._build_prompt(document_text, context, context_text)
         
         try:
-            print(f"[Risk Agent] Making API call to model: {self.model}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_MESSAGE},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
+            logger.debug("Making API call to model: %s", self.model)
+            response = call_with_retry(self.client.chat.completions.create, **self._request_kwargs(prompt))
+            result = self._parse_response(response)
+            if self.cache:
+                self.cache.store(cache_probe, result)
+            return result
             
-            content = response.choices[0].message.content
-            print(f"[Risk Agent] Received response: {content[:200]}...")
-            result = self._extract_json(content)
-            print(f"[Risk Agent] Parsed result with {len(result.get('risks', []))} risks")
+        except Exception as e:
+            logger.exception("Risk analysis failed: %s", e)
+            return self._empty_result()
+    
+    async def aprocess_document(
+        self, 
+        document_text: str, 
+        context: Dict[str, Any] = None,
+        context_text: str = None
+    ) -> Dict[str, Any]:
+        """
+        Async variant of process_document using the AsyncOpenAI client
+        
+        Args:
+            document_text: The document text to analyze
+            context: Optional context from the Summary Agent
+            context_text: Optional pre-serialized context, shared across chunks
+            
+        Returns:
+            Dictionary with open questions, assumptions, and risks
+        """
+        if self.cache:
+            cached, cache_probe = await self.cache.alookup(
+                "risk", self.model, document_text, context, self.aclient
+            )
+            if cached is not None:
+                logger.debug("Cache hit")
+                return cached
+        
+        prompt = self._build_prompt(document_text, context, context_text)
+        
+        try:
+            logger.debug("Making async API call to model: %s", self.model)
+            if self.stream:
+                result = await self._astream_result(prompt)
+            else:
+                response = await self._acreate(prompt)
+                result = self._parse_response(response)
+            if self.cache:
+                self.cache.store(cache_probe, result)
             return result
             
         except Exception as e:
-            print(f"[Risk Agent] ERROR: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return {
-                "open_questions": [],
-                "assumptions": [],
-                "missing_data": [],
-                "risks": []
-            }
+            logger.exception("Risk analysis failed: %s", e)
+            return self._empty_result()
+    
+    async def _astream_result(self, prompt: str) -> Dict[str, Any]:
+        """Request a streamed completion and parse it as soon as the JSON object closes"""
+        stream = await self._acreate(prompt, stream=True)
+        
+        accumulator = JsonStreamAccumulator()
+        try:
+            async for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                parsed = accumulator.add(chunk.choices[0].delta.content)
+                if isinstance(parsed, dict):
+                    return self._normalize_result(parsed)
+        finally:
+            await stream.close()
+        
+        # Incomplete or wrapped response: fall back to the regular extraction
+        return self._extract_json(accumulator.text)
     
     def process_chunks(
         self, 
@@ -169,13 +433,46 @@ Remember to respond with a valid JSON object containing open_questions, assumpti
         Returns:
             Combined risk analysis from all chunks
         """
+        # The context is the same for every chunk, so serialize it once
+        context_text = self._format_context(context)
+        results = [self.process_document(chunk["text"], context, context_text) for chunk in chunks]
+        return self._merge_results(results)
+    
+    async def aprocess_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        context: Dict[str, Any] = None,
+        max_concurrency: int = None
+    ) -> Dict[str, Any]:
+        """
+        Process multiple document chunks concurrently and combine risk analysis
+        
+        Args:
+            chunks: List of document chunks with text
+            context: Optional context from other agents
+            max_concurrency: Maximum number of in-flight API calls
+            
+        Returns:
+            Combined risk analysis from all chunks
+        """
+        sem = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        context_text = self._format_context(context)
+        
+        async def _one(chunk: Dict[str, Any]) -> Dict[str, Any]:
+            async with sem:
+                return await self.aprocess_document(chunk["text"], context, context_text)
+        
+        results = await asyncio.gather(*[_one(chunk) for chunk in chunks])
+        return self._merge_results(results)
+    
+    def _merge_results(self, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Combine per-chunk risk analyses into one"""
         all_questions = []
         all_assumptions = []
         all_missing_data = []
         all_risks = []
         
-        for chunk in chunks:
-            result = self.process_document(chunk["text"], context)
+        for result in results:
             all_questions.extend(result.get("open_questions", []))
             all_assumptions.extend(result.get("assumptions", []))
             all_missing_data.extend(result.get("missing_data", []))
@@ -183,87 +480,83 @@ Remember to respond with a valid JSON object containing open_questions, assumpti
         
         # Deduplicate
         return {
-            "open_questions": list(set(all_questions)),
-            "assumptions": list(set(all_assumptions)),
-            "missing_data": list(set(all_missing_data)),
+            "open_questions": ordered_dedup(all_questions),
+            "assumptions": ordered_dedup(all_assumptions),
+            "missing_data": ordered_dedup(all_missing_data),
             "risks": self._deduplicate_risks(all_risks)
         }
     
     def _deduplicate_risks(self, risks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Remove duplicate risks based on title similarity"""
+        """Remove duplicate or near-duplicate risks based on title similarity"""
         if len(risks) <= 1:
             return risks
         
         unique_risks = []
-        seen_titles = set()
+        seen_shingles = []
         
         for risk in risks:
-            title_lower = risk.get("title", "").lower().strip()
-            if title_lower and title_lower not in seen_titles:
-                seen_titles.add(title_lower)
+            title = risk.get("title", "")
+            if not title.strip():
+                continue
+            
+            shingle_set = word_shingles(title)
+            if not is_near_duplicate(shingle_set, seen_shingles):
+                seen_shingles.append(shingle_set)
                 unique_risks.append(risk)
         
         return unique_risks
     
     def _extract_json(self, content: str) -> Dict[str, Any]:
         """Extract and parse JSON response"""
-        print(f"[Risk Agent] _extract_json called with content length: {len(content)}")
-        print(f"[Risk Agent] Content preview: {content[:300]}")
+        logger.debug("Extracting JSON from %d characters", len(content))
         
         try:
-            # Look for JSON in code blocks
-            if "```json" in content:
-                print("[Risk Agent] Found ```json marker")
-                json_start = content.find("```json") + 7
-                json_end = content.find("```", json_start)
-                json_str = content[json_start:json_end].strip()
-            elif "```" in content:
-                print("[Risk Agent] Found ``` marker")
-                json_start = content.find("```") + 3
-                json_end = content.find("```", json_start)
-                json_str = content[json_start:json_end].strip()
-            else:
-                # Try to find JSON object directly
-                print("[Risk Agent] No code blocks, looking for JSON object")
-                json_start = content.find("{")
-                json_end = content.rfind("}") + 1
-                json_str = content[json_start:json_end]
+            result = self._load_json(content)
+            if not isinstance(result, dict):
+                raise ValueError("Response is not a JSON object")
+            result = self._normalize_result(result)
             
-            print(f"[Risk Agent] Extracted JSON string: {json_str[:200]}")
-            result = json.loads(json_str)
-            print(f"[Risk Agent] Successfully parsed JSON")
-            
-            # Ensure all required fields exist
-            if "open_questions" not in result:
-                result["open_questions"] = []
-            if "assumptions" not in result:
-                result["assumptions"] = []
-            if "missing_data" not in result:
-                result["missing_data"] = []
-            if "risks" not in result:
-                result["risks"] = []
-            
-            # Validate risk objects
-            validated_risks = []
-            for risk in result["risks"]:
-                if isinstance(risk, dict):
-                    validated_risks.append({
-                        "title": risk.get("title", "Untitled Risk"),
-                        "description": risk.get("description", "No description"),
-                        "severity": risk.get("severity", "medium"),
-                        "type": risk.get("type", "other"),
-                        "mitigation": risk.get("mitigation", "To be determined")
-                    })
-            result["risks"] = validated_risks
-            
-            print(f"[Risk Agent] Returning result with {len(result['risks'])} risks, {len(result['open_questions'])} questions")
+            logger.debug(
+                "Returning result with %d risks, %d questions",
+                len(result["risks"]), len(result["open_questions"])
+            )
             return result
             
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"[Risk Agent] JSON parsing failed: {str(e)}")
-            return {
-                "open_questions": [],
-                "assumptions": [],
-                "missing_data": [],
-                "risks": []
-            }
+        except (fast_json.JSONDecodeError, ValueError) as e:
+            logger.debug("JSON parsing failed: %s", e)
+            return self._empty_result()
+    
+    def _load_json(self, content: str) -> Any:
+        """Parse the response, scanning for fenced or embedded JSON unless it is schema-constrained"""
+        if self.structured_output:
+            try:
+                return fast_json.loads(content)
+            except fast_json.JSONDecodeError:
+                # Providers without structured-output support ignore response_format
+                pass
+        return extract_json(content, "{")
+    
+    def _normalize_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Ensure all required fields exist and validate risk objects"""
+        if "open_questions" not in result:
+            result["open_questions"] = []
+        if "assumptions" not in result:
+            result["assumptions"] = []
+        if "missing_data" not in result:
+            result["missing_data"] = []
+        if "risks" not in result:
+            result["risks"] = []
+        
+        validated_risks = []
+        for risk in result["risks"]:
+            if isinstance(risk, dict):
+                validated_risks.append({
+                    "title": risk.get("title", "Untitled Risk"),
+                    "description": risk.get("description", "No description"),
+                    "severity": risk.get("severity", "medium"),
+                    "type": risk.get("type", "other"),
+                    "mitigation": risk.get("mitigation", "To be determined")
+                })
+        result["risks"] = validated_risks
+        
+        return result
@@ -2,10 +2,87 @@
 Context-Aware Summary Agent
 Generates concise summaries while preserving intent, constraints, and critical decisions
 """
-from openai import OpenAI
-from typing import Dict, Any, List
-import json
+from openai import AsyncOpenAI
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+from utils.openai_client import get_client, get_async_client
+from utils.document_processor import get_encoding
+from utils import fast_json
+from utils.prompt_caching import build_system_message, cached_prompt_tokens
+from utils.ratelimit import acreate_limited, get_rate_limiter
+from utils.retry import call_with_retry
+from utils.streaming import JsonObjectScanner
+from utils.structured_output import enum_string, json_schema_format, strict_object, string_array
+from utils.summary_cache import SummaryCache, get_summary_cache
+from .cache import get_agent_cache
+import asyncio
+import logging
 import os
+import re
+from functools import lru_cache
+from itertools import chain
+
+logger = logging.getLogger(__name__)
+
+
+# Object inside a ```json (or bare ```) fence, matched in a single scan
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+_SUMMARY_RESPONSE_FORMAT = json_schema_format("summary", strict_object({
+    "summary": {"type": "string"},
+    "key_decisions": string_array(),
+    "constraints": string_array(),
+    "intent": {"type": "string"}
+}))
+
+
+@lru_cache(maxsize=32)
+def _prompt_tokens(text: str) -> int:
+    """Token count of a constant prompt fragment, tokenized once per process"""
+    return len(get_encoding("cl100k_base").encode(text))
+
+
+_SUMMARY_FIELDS = ("summary", "key_decisions", "constraints", "intent")
+_RISK_FIELDS = ("open_questions", "assumptions", "missing_data", "risks")
+
+_FUSED_USER_TEMPLATE = """Please analyze the following document and provide its structured summary, action items, and risks:
+
+DOCUMENT:
+{document}
+
+LIMIT ACTIONS AND RISKS TO THE TOP 5 MOST CRITICAL OF EACH. KEEP DESCRIPTIONS SHORT.
+
+Remember to respond with a valid JSON object containing: summary, key_decisions, constraints, intent, actions, open_questions, assumptions, missing_data, and risks."""
+
+_FUSED_RESPONSE_FORMAT = json_schema_format("document_analysis", strict_object({
+    "summary": {"type": "string"},
+    "key_decisions": string_array(),
+    "constraints": string_array(),
+    "intent": {"type": "string"},
+    "actions": {
+        "type": "array",
+        "items": strict_object({
+            "task": {"type": "string"},
+            "owner": {"type": "string"},
+            "deadline": {"type": "string"},
+            "dependencies": string_array(),
+            "priority": enum_string(["high", "medium", "low"]),
+            "status": enum_string(["pending", "in-progress", "blocked"])
+        })
+    },
+    "open_questions": string_array(),
+    "assumptions": string_array(),
+    "missing_data": string_array(),
+    "risks": {
+        "type": "array",
+        "items": strict_object({
+            "title": {"type": "string"},
+            "description": {"type": "string"},
+            "severity": enum_string(["high", "medium", "low"]),
+            "type": enum_string(["technical", "resource", "timeline", "scope", "dependency", "other"]),
+            "mitigation": {"type": "string"}
+        })
+    }
+}))
 
 
 class SummaryAgent:
@@ -36,6 +113,52 @@ Focus on:
 
 Be precise and factual. Do not add information not present in the document."""
     
+    # Single-request variant covering the Summary, Action and Risk agents' tasks
+    FUSED_SYSTEM_MESSAGE = """You are a Document Analysis Agent that summarizes documents, extracts their action items, and identifies their risks in a single pass.
+
+You MUST respond with a valid JSON object in this exact format:
+{
+    "summary": "A concise summary (150-200 words) preserving intent and key points",
+    "key_decisions": ["Decision 1", "Decision 2", ...],
+    "constraints": ["Constraint 1", "Constraint 2", ...],
+    "intent": "The primary purpose or goal of this document",
+    "actions": [
+        {
+            "task": "Clear description of the task",
+            "owner": "Person or team responsible, or 'Not specified'",
+            "deadline": "Deadline as written in the document, or 'Not specified'",
+            "dependencies": ["Task or event this depends on"],
+            "priority": "high|medium|low",
+            "status": "pending|in-progress|blocked"
+        }
+    ],
+    "open_questions": ["Question or unclear point that needs resolution"],
+    "assumptions": ["Assumption being made (what is taken for granted)"],
+    "missing_data": ["Information that is needed but not provided"],
+    "risks": [
+        {
+            "title": "Brief risk title",
+            "description": "Description of the risk",
+            "severity": "high|medium|low",
+            "type": "technical|resource|timeline|scope|dependency|other",
+            "mitigation": "Suggested mitigation if obvious, or 'To be determined'"
+        }
+    ]
+}
+
+Guidelines:
+- Include explicit tasks ("John will do X") and implicit ones ("We need to verify Y"); completed work is not an action
+- Infer priority and risk severity from urgency, importance, and consequences
+- Flag unanswered questions, undecided points, referenced-but-missing information, and implicit assumptions
+
+Be precise and factual. Do not add information, tasks, or risks not present in or implied by the document."""
+    
+    # Intent reported when the response could not be parsed as JSON
+    PARSE_FAILED_INTENT = "Unable to parse structured response"
+    
+    # Characters sampled for the document fingerprint, spread across all chunks
+    FINGERPRINT_SAMPLE_CHARS = 6000
+    
     def __init__(self, llm_config: Dict[str, Any]):
         """
         Initialize the Summary Agent
@@ -45,15 +168,195 @@ Be precise and factual. Do not add information not present in the document."""
         """
         config = llm_config["config_list"][0]
         
-        # Initialize OpenAI client with optional base_url for OpenRouter
-        client_kwargs = {"api_key": config["api_key"]}
-        if "base_url" in config:
-            client_kwargs["base_url"] = config["base_url"]
-        
-        self.client = OpenAI(**client_kwargs)
+        # Shared OpenAI client with optional base_url for OpenRouter
+        self.api_key = config["api_key"]
+        self.base_url = config.get("base_url")
+        self.client = get_client(self.api_key, self.base_url)
         self.model = config["model"]
         self.temperature = llm_config.get("temperature", 0.5)
         self.max_tokens = llm_config.get("max_tokens", 4096)
+        self.max_concurrency = llm_config.get("max_concurrency", 8)
+        self.pack_context_limit = llm_config.get("summary_pack_tokens", 8000)
+        self.fingerprint = llm_config.get("summary_fingerprint", False)
+        self.stream = llm_config.get("stream", False)
+        self.structured_output = llm_config.get("structured_output", False)
+        self.rate_limiter = get_rate_limiter(
+            self.api_key, self.model, llm_config.get("rate_limit_rpm", 0), llm_config.get("rate_limit_tpm", 0)
+        )
+        # Exact matches persist on disk; near-duplicates are found by embedding similarity
+        self.cache = None
+        self.semantic_cache = None
+        if llm_config.get("enable_cache"):
+            self.cache = get_summary_cache(llm_config.get("summary_cache_dir", ".cache"))
+            self.semantic_cache = get_agent_cache(llm_config.get("cache_ttl", 3600))
+    
+    @property
+    def aclient(self) -> AsyncOpenAI:
+        """Async client shared across agents on the running event loop"""
+        return get_async_client(self.api_key, self.base_url)
+    
+    def _fingerprint_sample(self, chunks: List[Dict[str, Any]]) -> str:
+        """Opening sentences of every chunk, so the fingerprint reflects the whole document"""
+        per_chunk = max(200, self.FINGERPRINT_SAMPLE_CHARS // len(chunks))
+        excerpts = []
+        for chunk in chunks:
+            text = chunk["text"]
+            if len(text) > per_chunk:
+                text = text[:per_chunk]
+                # Cut back to the last complete sentence when the window holds one
+                end = max(text.rfind(". "), text.rfind("! "), text.rfind("? "))
+                if end > 0:
+                    text = text[:end + 1]
+            excerpts.append(text)
+        return "\n...\n".join(excerpts)
+    
+    def _build_fingerprint_prompt(self, sample: str) -> str:
+        """Build the user prompt for a one-line document fingerprint"""
+        return f"""The following excerpts are the opening sentences of each part of a document, in order. In a single sentence of about 150 characters, state what the whole document is and its primary purpose.
+
+DOCUMENT EXCERPTS:
+{sample}
+
+Respond with the sentence only, not JSON."""
+    
+    def _build_chunk_prompt(self, document_text: str, fingerprint: str) -> str:
+        """Build the user prompt for the summary, decisions and constraints local to one chunk"""
+        return f"""DOCUMENT CONTEXT: {fingerprint}
+
+The following is one part of that document. Summarize this part in one or two sentences, and list only the decisions and constraints stated in it:
+
+DOCUMENT PART:
+{document_text}
+
+Respond with a valid JSON object containing only: summary, key_decisions, and constraints."""
+    
+    def _build_prompt(self, document_text: str) -> str:
+        """Build the user prompt for a document"""
+        return f"""Please analyze the following document and provide a structured summary:
+
+DOCUMENT:
+{document_text}
+
+Remember to respond with a valid JSON object containing: summary, key_decisions, constraints, and intent."""
+    
+    def _build_messages(self, prompt: str) -> List[Dict[str, Any]]:
+        """Build the chat messages for a prompt, keeping the static system message first"""
+        return [
+            build_system_message(self.SYSTEM_MESSAGE, self.model),
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _request_kwargs(self, prompt: str, structured: bool = True) -> Dict[str, Any]:
+        """
+        Chat completion arguments shared by the sync, async and batch paths
+        
+        Args:
+            prompt: User prompt
+            structured: Whether the prompt asks for a full summary object, so the
+                response can be schema-constrained (packed, fingerprint and
+                chunk-local prompts ask for other shapes)
+        """
+        kwargs = {
+            "model": self.model,
+            "messages": self._build_messages(prompt),
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if self.structured_output and structured:
+            kwargs["response_format"] = _SUMMARY_RESPONSE_FORMAT
+        return kwargs
+    
+    async def _acreate(self, prompt: str, structured: bool = True, **kwargs) -> Any:
+        """Send a chat completion request (with retries) once the shared rate limit allows it"""
+        request = self._request_kwargs(prompt, structured)
+        request.update(kwargs)
+        return await acreate_limited(
+            self.aclient.chat.completions, self.rate_limiter, len(prompt) // 4, **request
+        )
+    
+    def _parse_response(self, response) -> Dict[str, Any]:
+        """Extract the structured summary from a chat completion response"""
+        logger.debug("Cached prompt tokens: %d", cached_prompt_tokens(getattr(response, "usage", None)))
+        return self._parse_content(response.choices[0].message.content)
+    
+    def _parse_content(self, content: str) -> Dict[str, Any]:
+        """Extract the structured summary from response text"""
+        result = self._extract_json(content)
+        logger.debug("Parsed summary with %d decisions", len(result.get("key_decisions", [])))
+        return result
+    
+    def _cache_key(self, document_text: str) -> str:
+        """Key for a document's summary in the disk cache"""
+        return SummaryCache.make_key(self.model, self.SYSTEM_MESSAGE, document_text)
+    
+    def _cache_lookup(self, document_text: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Look up a summary in the disk cache, then the semantic cache
+        
+        Returns:
+            Tuple of (cached summary or None, semantic cache probe for storing)
+        """
+        cached = self.cache.get(self._cache_key(document_text))
+        if cached is not None:
+            return cached, None
+        return self.semantic_cache.lookup("summary", self.model, document_text, None, self.client)
+    
+    async def _acache_lookup(self, document_text: str) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Async variant of _cache_lookup"""
+        cached = self.cache.get(self._cache_key(document_text))
+        if cached is not None:
+            return cached, None
+        return await self.semantic_cache.alookup("summary", self.model, document_text, None, self.aclient)
+    
+    def _cache_result(
+        self,
+        document_text: str,
+        probe: Optional[Dict[str, Any]],
+        result: Dict[str, Any]
+    ):
+        """Store a successfully parsed summary in both cache tiers (the caller saves the disk tier)"""
+        if result.get("intent") == self.PARSE_FAILED_INTENT:
+            return
+        self.cache.put(self._cache_key(document_text), result)
+        if probe is not None:
+            self.semantic_cache.store(probe, result)
+    
+    async def _apersist_cache(self):
+        """Write new summaries to disk once per call, off the event loop"""
+        if self.cache:
+            await asyncio.to_thread(self.cache.save)
+    
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        """Build a degraded summary describing an API error"""
+        error_msg = str(error)
+        
+        # Check for Rate Limit Error or 404
+        if "429" in error_msg or "Rate limit" in error_msg:
+            logger.error("Summary request failed: %s", error_msg)
+            return {
+                "summary": "⚠️ System Error: API Rate Limit Exceeded. Please switch models.",
+                "key_decisions": [],
+                "constraints": ["API Quota Reached"],
+                "intent": "Error: Rate Limit"
+            }
+        
+        if "404" in error_msg:
+            logger.error("Summary request failed: %s", error_msg)
+            return {
+                "summary": "⚠️ System Error: Model Not Found (404). The selected model is unavailable.",
+                "key_decisions": [],
+                "constraints": ["Model Unavailable"],
+                "intent": "Error: Model 404"
+            }
+        
+        # Unexpected failure: log the traceback too
+        logger.error("Summary request failed: %s", error_msg, exc_info=error)
+        return {
+            "summary": f"Error processing document: {error_msg}",
+            "key_decisions": [],
+            "constraints": [],
+            "intent": "Error occurred"
+        }
     
     def process_document(self, document_text: str) -> Dict[str, Any]:
         """
@@ -65,60 +368,170 @@ Be precise and factual. Do not add information not present in the document."""
         Returns:
             Dictionary with summary, key decisions, and constraints
         """
-        prompt = f"""Please analyze the following document and provide a structured summary:
-
-DOCUMENT:
-{document_text}
-
-Remember to respond with a valid JSON object containing: summary, key_decisions, constraints, and intent."""
+        if self.cache:
+            cached, cache_probe = self._cache_lookup(document_text)
+            if cached is not None:
+                return cached
+        
+        prompt = self._build_prompt(document_text)
         
         try:
-            print(f"[Summary Agent] Making API call to model: {self.model}")
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_MESSAGE},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
-            
-            content = response.choices[0].message.content
-            print(f"[Summary Agent] Received response: {content[:200]}...")
-            result = self._extract_json(content)
-            print(f"[Summary Agent] Parsed result: {result}")
+            logger.debug("Making API call to model: %s", self.model)
+            response = call_with_retry(self.client.chat.completions.create, **self._request_kwargs(prompt))
+            result = self._parse_response(response)
+            if self.cache:
+                self._cache_result(document_text, cache_probe, result)
+                self.cache.save()
             return result
             
         except Exception as e:
-            error_msg = str(e)
-            print(f"[Summary Agent] ERROR: {error_msg}")
+            return self._error_result(e)
+    
+    async def aprocess_document(self, document_text: str) -> Dict[str, Any]:
+        """
+        Async variant of process_document using the AsyncOpenAI client
+        
+        Args:
+            document_text: The document text to summarize
             
-            # Check for Rate Limit Error or 404
-            if "429" in error_msg or "Rate limit" in error_msg:
-                return {
-                    "summary": "⚠️ System Error: API Rate Limit Exceeded. Please switch models.",
-                    "key_decisions": [],
-                    "constraints": ["API Quota Reached"],
-                    "intent": "Error: Rate Limit"
-                }
+        Returns:
+            Dictionary with summary, key decisions, and constraints
+        """
+        cache_probe = None
+        if self.cache:
+            cached, cache_probe = await self._acache_lookup(document_text)
+            if cached is not None:
+                return cached
+        
+        result = await self._asummarize_uncached(document_text, cache_probe)
+        await self._apersist_cache()
+        return result
+    
+    async def _asummarize_uncached(
+        self,
+        document_text: str,
+        cache_probe: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Summarize a document whose cache lookup has already missed
+        
+        Args:
+            document_text: The document text to summarize
+            cache_probe: Semantic cache probe returned by that lookup, reused
+                to store the result without embedding the text again
+        """
+        prompt = self._build_prompt(document_text)
+        
+        try:
+            logger.debug("Making async API call to model: %s", self.model)
+            result = self._parse_content(await self._acomplete(prompt))
+            if self.cache:
+                self._cache_result(document_text, cache_probe, result)
+            return result
             
-            if "404" in error_msg:
-                return {
-                    "summary": "⚠️ System Error: Model Not Found (404). The selected model is unavailable.",
-                    "key_decisions": [],
-                    "constraints": ["Model Unavailable"],
-                    "intent": "Error: Model 404"
-                }
-
-            import traceback
-            traceback.print_exc()
-            return {
-                "summary": f"Error processing document: {error_msg}",
-                "key_decisions": [],
-                "constraints": [],
-                "intent": "Error occurred"
-            }
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def _acomplete(self, prompt: str, structured: bool = True) -> str:
+        """
+        Request a completion and return its text once the rate limit allows it
+        
+        When streaming is enabled, reading stops as soon as the top-level JSON
+        object closes; if the server sends no streamed content, a regular
+        request is made instead.
+        """
+        if self.stream:
+            content = await self._astream_content(prompt, structured)
+            if content:
+                return content
+        
+        response = await self._acreate(prompt, structured)
+        logger.debug("Cached prompt tokens: %d", cached_prompt_tokens(getattr(response, "usage", None)))
+        return response.choices[0].message.content or ""
+    
+    async def _astream_content(self, prompt: str, structured: bool = True) -> str:
+        """Stream a completion, returning the JSON object as soon as it is complete"""
+        stream = await self._acreate(prompt, structured, stream=True)
+        
+        scanner = JsonObjectScanner()
+        parts = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                delta = chunk.choices[0].delta.content
+                parts.append(delta)
+                
+                # Stop reading once the object is complete; any trailing prose is unused
+                completed = scanner.feed(delta)
+                if completed is not None:
+                    return completed
+        finally:
+            await stream.close()
+        
+        # Incomplete or unstructured response: let the regular extraction handle it
+        return "".join(parts)
+    
+    def process_document_fused(self, document_text: str) -> Optional[Dict[str, Any]]:
+        """Blocking variant of aprocess_document_fused"""
+        return asyncio.run(self.aprocess_document_fused(document_text))
+    
+    async def aprocess_document_fused(self, document_text: str) -> Optional[Dict[str, Any]]:
+        """
+        Summarize a document and extract its action items and risks in one request
+        
+        The document is sent once instead of once per agent. Intended for
+        documents that fit in a single chunk, so the combined answer fits in
+        max_tokens.
+        
+        Args:
+            document_text: The document text to analyze
+            
+        Returns:
+            Dictionary with the normalized "summary", the raw "actions" list and
+            the raw "risks" analysis, or None if the request failed or the
+            response was truncated or unparseable (callers fall back to the
+            individual agents)
+        """
+        prompt = _FUSED_USER_TEMPLATE.format(document=document_text)
+        request = {
+            "model": self.model,
+            "messages": [
+                build_system_message(self.FUSED_SYSTEM_MESSAGE, self.model),
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens
+        }
+        if self.structured_output:
+            request["response_format"] = _FUSED_RESPONSE_FORMAT
+        
+        try:
+            response = await acreate_limited(
+                self.aclient.chat.completions, self.rate_limiter, len(prompt) // 4, **request
+            )
+        except Exception as e:
+            logger.warning("Fused request failed: %s", e)
+            return None
+        
+        choice = response.choices[0]
+        if choice.finish_reason == "length":
+            logger.warning("Fused response exceeded max_tokens")
+            return None
+        try:
+            result = self._load_json(choice.message.content or "")
+        except (fast_json.JSONDecodeError, ValueError) as e:
+            logger.warning("Fused response could not be parsed: %s", e)
+            return None
+        if not isinstance(result, dict):
+            return None
+        
+        actions = result.get("actions")
+        return {
+            "summary": self._normalize_summary({key: result[key] for key in _SUMMARY_FIELDS if key in result}),
+            "actions": actions if isinstance(actions, list) else [],
+            "risks": {key: result[key] for key in _RISK_FIELDS if key in result}
+        }
     
     def process_chunks(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -133,17 +546,216 @@ Remember to respond with a valid JSON object containing: summary, key_decisions,
         if len(chunks) == 1:
             return self.process_document(chunks[0]["text"])
         
-        # Process each chunk
-        chunk_summaries = []
+        return asyncio.run(self.aprocess_chunks(chunks))
+    
+    async def aprocess_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        max_concurrency: int = None
+    ) -> Dict[str, Any]:
+        """
+        Summarize multiple document chunks concurrently and synthesize a summary
+        
+        Args:
+            chunks: List of document chunks with text
+            max_concurrency: Maximum number of in-flight API calls
+            
+        Returns:
+            Synthesized summary from all chunks
+        """
+        if len(chunks) == 1:
+            return await self.aprocess_document(chunks[0]["text"])
+        
+        sem = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        
+        # The fingerprint call replaces the synthesis call on the critical path
+        fingerprint = await self._afingerprint(self._fingerprint_sample(chunks)) if self.fingerprint else None
+        
+        async def _one(pack: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            async with sem:
+                return await self._asummarize_pack(pack, fingerprint)
+        
+        # Repeated boilerplate chunks are summarized once and share the result
+        unique_index: Dict[str, int] = {}
+        unique_chunks = []
         for chunk in chunks:
-            summary = self.process_document(chunk["text"])
-            chunk_summaries.append(summary)
+            if chunk["text"] not in unique_index:
+                unique_index[chunk["text"]] = len(unique_chunks)
+                unique_chunks.append(chunk)
+        
+        packs = self._pack_chunks(unique_chunks) if self.pack_context_limit else [[chunk] for chunk in unique_chunks]
+        pack_summaries = await asyncio.gather(*[_one(pack) for pack in packs])
+        unique_summaries = [summary for summaries in pack_summaries for summary in summaries]
+        chunk_summaries = [unique_summaries[unique_index[chunk["text"]]] for chunk in chunks]
+        await self._apersist_cache()
+        
+        if fingerprint:
+            return self._merge_summaries(chunk_summaries, fingerprint)
         
         # Synthesize all chunk summaries
-        synthesis_prompt = f"""You have analyzed a long document in {len(chunks)} parts. 
+        synthesis_prompt = self._build_synthesis_prompt(chunk_summaries)
+        
+        try:
+            return self._extract_json(await self._acomplete(synthesis_prompt))
+            
+        except Exception as e:
+            # Fallback: merge all chunk summaries
+            return self._merge_summaries(chunk_summaries)
+    
+    def system_token_budget(self) -> int:
+        """Tokens taken by the system message (tokenized once per process)"""
+        return _prompt_tokens(self.SYSTEM_MESSAGE)
+    
+    def _pack_chunks(
+        self,
+        chunks: List[Dict[str, Any]],
+        sys_tokens: Optional[int] = None,
+        resp_buffer: int = 1200,
+        merge_threshold: float = 0.95
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Greedily group consecutive chunks so each group fits in one request
+        
+        Args:
+            chunks: List of document chunks with text and token counts
+            sys_tokens: Tokens reserved for the system message and packing
+                instructions (measured from the actual prompts when None)
+            resp_buffer: Tokens reserved for the response
+            merge_threshold: An undersized last group is folded into the previous
+                one if the result stays within budget / merge_threshold
+            
+        Returns:
+            List of chunk groups, in document order
+        """
+        if sys_tokens is None:
+            sys_tokens = self.system_token_budget() + _prompt_tokens(self._build_packed_prompt([]))
+        budget = self.pack_context_limit - sys_tokens - resp_buffer
+        packs = []
+        current = []
+        current_tokens = 0
+        for chunk in chunks:
+            tokens = chunk.get("tokens") or len(chunk["text"]) // 4
+            if current and current_tokens + tokens > budget:
+                packs.append((current, current_tokens))
+                current = []
+                current_tokens = 0
+            current.append(chunk)
+            current_tokens += tokens
+        if current:
+            packs.append((current, current_tokens))
+        
+        # Save a round trip when the tail only slightly overflows its predecessor
+        if len(packs) > 1:
+            (previous, previous_tokens), (last, last_tokens) = packs[-2], packs[-1]
+            if previous_tokens + last_tokens <= budget / merge_threshold:
+                packs[-2:] = [(previous + last, previous_tokens + last_tokens)]
+        
+        return [pack for pack, _ in packs]
+    
+    async def _afingerprint(self, sample: str) -> Optional[str]:
+        """
+        Describe a document in one short sentence, used as shared context for its chunks
+        
+        Args:
+            sample: Excerpts spread across the document (see _fingerprint_sample)
+        
+        Returns:
+            The fingerprint, or None if the request failed
+        """
+        try:
+            response = await self._acreate(self._build_fingerprint_prompt(sample), structured=False, max_tokens=60)
+        except Exception as e:
+            logger.warning("Fingerprint request failed, summarizing chunks in full: %s", e)
+            return None
+        return (response.choices[0].message.content or "").strip().strip('"') or None
+    
+    async def _asummarize_chunk(self, document_text: str, fingerprint: Optional[str]) -> Dict[str, Any]:
+        """Summarize one chunk in full, or without its intent given a fingerprint"""
+        if not fingerprint:
+            return await self.aprocess_document(document_text)
+        try:
+            prompt = self._build_chunk_prompt(document_text, fingerprint)
+            return self._parse_content(await self._acomplete(prompt, structured=False))
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def _asummarize_pack(
+        self,
+        pack: List[Dict[str, Any]],
+        fingerprint: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Summarize a group of chunks in a single request
+        
+        Falls back to one request per chunk if the response doesn't contain
+        exactly one summary per chunk. Chunk-local results depend on the
+        fingerprint, so they bypass the summary cache.
+        """
+        results = [None] * len(pack)
+        probes = [None] * len(pack)
+        if self.cache and not fingerprint:
+            lookups = await asyncio.gather(*[self._acache_lookup(chunk["text"]) for chunk in pack])
+            for i, (cached, probe) in enumerate(lookups):
+                results[i], probes[i] = cached, probe
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        def summarize_one(i: int) -> Awaitable[Dict[str, Any]]:
+            # Chunks looked up above already missed the cache; skip a second lookup
+            if self.cache and not fingerprint:
+                return self._asummarize_uncached(pack[i]["text"], probes[i])
+            return self._asummarize_chunk(pack[i]["text"], fingerprint)
+        
+        if len(pending) == 1:
+            results[pending[0]] = await summarize_one(pending[0])
+        elif pending:
+            prompt = self._build_packed_prompt([pack[i] for i in pending], fingerprint)
+            summaries = None
+            try:
+                response = await self._acreate(prompt, structured=False)
+                summaries = self._extract_summary_list(response.choices[0].message.content or "", len(pending))
+            except Exception as e:
+                logger.warning("Packed request failed, summarizing chunks individually: %s", e)
+            
+            if summaries is None:
+                summaries = await asyncio.gather(*[summarize_one(i) for i in pending])
+            elif self.cache and not fingerprint:
+                for i, summary in zip(pending, summaries):
+                    self._cache_result(pack[i]["text"], probes[i], summary)
+            for i, summary in zip(pending, summaries):
+                results[i] = summary
+        
+        return results
+    
+    def _build_packed_prompt(self, pack: List[Dict[str, Any]], fingerprint: Optional[str] = None) -> str:
+        """Build the prompt that asks for one summary per chunk in a group"""
+        if fingerprint:
+            parts = [
+                f"DOCUMENT CONTEXT: {fingerprint}",
+                f"The following {len(pack)} chunks are parts of that document. For each chunk separately, "
+                f"summarize it in one or two sentences and list only the decisions and constraints stated in it.\n"
+                f"Return a JSON array where element i is the result for CHUNK i."
+            ]
+            fields = "summary, key_decisions, and constraints"
+        else:
+            parts = [
+                f"Please analyze each of the following {len(pack)} document chunks separately "
+                f"and provide a structured summary for each.\n"
+                f"Return a JSON array where element i is the structured summary for CHUNK i."
+            ]
+            fields = "summary, key_decisions, constraints, and intent"
+        for i, chunk in enumerate(pack):
+            parts.append(f"CHUNK {i}:\n{chunk['text']}")
+        parts.append(
+            f"Remember to respond with a valid JSON array of {len(pack)} objects, each containing: {fields}."
+        )
+        return "\n\n".join(parts)
+    
+    def _build_synthesis_prompt(self, chunk_summaries: List[Dict[str, Any]]) -> str:
+        """Build the prompt that combines per-chunk summaries into one"""
+        return f"""You have analyzed a long document in {len(chunk_summaries)} parts. 
 Here are the summaries from each part:
 
-{json.dumps(chunk_summaries, indent=2)}
+{fast_json.dumps(chunk_summaries, indent=True)}
 
 Please create a final synthesized summary that:
 1. Combines insights from all parts
@@ -152,88 +764,95 @@ Please create a final synthesized summary that:
 4. Maintains the overall intent
 
 Respond with a valid JSON object in the same format."""
-        
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self.SYSTEM_MESSAGE},
-                    {"role": "user", "content": synthesis_prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
-            
-            content = response.choices[0].message.content
-            return self._extract_json(content)
-            
-        except Exception as e:
-            # Fallback: merge all chunk summaries
-            return self._merge_summaries(chunk_summaries)
     
     def _extract_json(self, content: str) -> Dict[str, Any]:
         """Extract and parse JSON from response"""
-        print(f"[Summary Agent] _extract_json called with content length: {len(content)}")
-        print(f"[Summary Agent] Content preview: {content[:300]}")
-        
         try:
-            # Look for JSON in code blocks
-            if "```json" in content:
-                print("[Summary Agent] Found ```json marker")
-                json_start = content.find("```json") + 7
-                json_end = content.find("```", json_start)
-                json_str = content[json_start:json_end].strip()
-            elif "```" in content:
-                print("[Summary Agent] Found ``` marker")
-                json_start = content.find("```") + 3
-                json_end = content.find("```", json_start)
-                json_str = content[json_start:json_end].strip()
-            else:
-                # Try to find JSON object directly
-                print("[Summary Agent] No code blocks, looking for JSON object")
-                json_start = content.find("{")
-                json_end = content.rfind("}") + 1
-                json_str = content[json_start:json_end]
-            
-            print(f"[Summary Agent] Extracted JSON string: {json_str[:200]}")
-            result = json.loads(json_str)
-            print(f"[Summary Agent] Successfully parsed JSON: {result}")
-            
-            # Ensure all required fields exist
-            if "summary" not in result:
-                result["summary"] = "Summary not available"
-            if "key_decisions" not in result:
-                result["key_decisions"] = []
-            if "constraints" not in result:
-                result["constraints"] = []
-            if "intent" not in result:
-                result["intent"] = "Intent not specified"
+            result = self._load_json(content)
+            if not isinstance(result, dict):
+                raise ValueError("Response is not a JSON object")
+            return self._normalize_summary(result)
             
-            print(f"[Summary Agent] Returning result with {len(result.get('key_decisions', []))} decisions")
-            return result
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            print(f"[Summary Agent] JSON parsing failed: {str(e)}")
+        except (fast_json.JSONDecodeError, ValueError) as e:
+            logger.debug("JSON parsing failed: %s", e)
             # Fallback: create a basic summary from the content
             return {
                 "summary": content[:500] if len(content) > 500 else content,
                 "key_decisions": [],
                 "constraints": [],
-                "intent": "Unable to parse structured response"
+                "intent": self.PARSE_FAILED_INTENT
             }
     
-    def _merge_summaries(self, summaries: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Merge multiple summaries into one"""
-        all_decisions = []
-        all_constraints = []
+    def _load_json(self, content: str) -> Any:
+        """Parse the response, scanning for fenced or embedded JSON unless it is schema-constrained"""
+        if self.structured_output:
+            try:
+                return fast_json.loads(content)
+            except fast_json.JSONDecodeError:
+                # Providers without structured-output support ignore response_format
+                pass
         
+        # One pass for a fenced object; otherwise decode in place from the first brace
+        match = _JSON_BLOCK_RE.search(content)
+        if match:
+            return fast_json.loads(match.group(1))
+        json_start = content.find("{")
+        if json_start == -1:
+            raise ValueError("No JSON object found in response")
+        return fast_json.decode_prefix(content, json_start)[0]
+    
+    def _normalize_summary(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Ensure all required fields exist"""
+        if "summary" not in result:
+            result["summary"] = "Summary not available"
+        if "key_decisions" not in result:
+            result["key_decisions"] = []
+        if "constraints" not in result:
+            result["constraints"] = []
+        if "intent" not in result:
+            result["intent"] = "Intent not specified"
+        return result
+    
+    def _extract_summary_list(self, content: str, count: int) -> Optional[List[Dict[str, Any]]]:
+        """Parse a packed response into per-chunk summaries, or None if it doesn't match the pack"""
+        json_start = content.find("[")
+        json_end = content.rfind("]") + 1
+        try:
+            result = fast_json.loads(content[json_start:json_end])
+        except (fast_json.JSONDecodeError, ValueError):
+            return None
+        
+        if not isinstance(result, list) or len(result) != count:
+            return None
+        if not all(isinstance(item, dict) for item in result):
+            return None
+        return [self._normalize_summary(item) for item in result]
+    
+    def _merge_summaries(self, summaries: List[Dict[str, Any]], fingerprint: Optional[str] = None) -> Dict[str, Any]:
+        """Merge multiple summaries into one, taking the intent from the fingerprint if given"""
+        # dict.fromkeys drops exact repeats while keeping first-seen order
+        all_decisions = dict.fromkeys(chain.from_iterable(s.get("key_decisions", []) for s in summaries))
+        all_constraints = dict.fromkeys(chain.from_iterable(s.get("constraints", []) for s in summaries))
+        
+        # Stop collecting once the truncated summary is fully covered
+        parts = []
+        length = 0
         for s in summaries:
-            all_decisions.extend(s.get("key_decisions", []))
-            all_constraints.extend(s.get("constraints", []))
+            text = s.get("summary", "")
+            parts.append(text)
+            length += len(text) + 1
+            if length >= 500:
+                break
+        summary = " ".join(parts)[:500]
+        
+        if fingerprint:
+            intent = fingerprint
+        else:
+            intent = summaries[0].get("intent", "Unknown") if summaries else "Unknown"
         
         return {
-            "summary": " ".join([s.get("summary", "") for s in summaries])[:500],
-            "key_decisions": list(set(all_decisions)),
-            "constraints": list(set(all_constraints)),
-            "intent": summaries[0].get("intent", "Unknown") if summaries else "Unknown"
+            "summary": summary,
+            "key_decisions": list(all_decisions),
+            "constraints": list(all_constraints),
+            "intent": intent
         }
@@ -5,15 +5,22 @@ import streamlit as st
 import sys
 from pathlib import Path
 import json
+import logging
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent))
 
-from agents.orchestrator import DocumentOrchestrator
-from utils.config import Config
-from utils.output_formatter import OutputFormatter
-from utils.document_processor import DocumentProcessor
+from utils.config import get_config
+
+# The agents, document readers and pandas are imported where they are first
+# used, so a cold start only pays for what the session actually touches
+if TYPE_CHECKING:
+    from agents.orchestrator import DocumentOrchestrator
+
+# Agent debug output stays quiet unless the level is lowered
+logging.basicConfig(level=logging.INFO)
 
 # Page configuration
 st.set_page_config(
@@ -66,6 +73,13 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+@st.cache_resource(show_spinner=False)
+def get_orchestrator() -> "DocumentOrchestrator":
+    """Orchestrator shared across reruns and sessions (agents hold no per-document state)"""
+    from agents.orchestrator import DocumentOrchestrator
+    return DocumentOrchestrator(get_config())
+
+
 def initialize_session_state():
     """Initialize session state variables"""
     if 'results' not in st.session_state:
@@ -117,7 +131,7 @@ def display_sidebar():
         st.divider()
         
         st.header("⚙️ Configuration")
-        config = Config()
+        config = get_config()
         
         if config.validate():
             st.success("✓ Configuration valid")
@@ -159,6 +173,8 @@ def display_input_section():
         )
         
         if uploaded_file:
+            from utils.document_processor import DocumentProcessor
+            
             file_extension = Path(uploaded_file.name).suffix.lower()
             processor = DocumentProcessor()
             
@@ -231,6 +247,8 @@ def display_results():
     if not st.session_state.results:
         return
     
+    from utils.output_formatter import OutputFormatter
+    
     results = st.session_state.results
     formatter = OutputFormatter()
     
@@ -344,9 +362,8 @@ def main():
             display_processing_status()
         
         try:
-            # Initialize orchestrator
-            config = Config()
-            orchestrator = DocumentOrchestrator(config)
+            # Reuse the cached orchestrator
+            orchestrator = get_orchestrator()
             
             # Validate configuration
             is_valid, error_msg = orchestrator.validate_configuration()
@@ -0,0 +1,62 @@
+import inspect
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Tests import the app's packages (agents, utils) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class StubCompletions:
+    """chat.completions stand-in that answers each request with reply(request)
+
+    reply returns the message content, a (content, finish_reason) tuple, or an
+    awaitable of either (to hold a request open).
+    """
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.calls = []
+
+    async def create(self, **request):
+        self.calls.append(request)
+        content = self.reply(request)
+        if inspect.isawaitable(content):
+            content = await content
+        finish_reason = "stop"
+        if isinstance(content, tuple):
+            content, finish_reason = content
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason=finish_reason)], usage=None)
+
+
+class StubAsyncClient:
+    """AsyncOpenAI stand-in for agent tests; embeddings are unavailable"""
+
+    def __init__(self, reply):
+        self.chat = SimpleNamespace(completions=StubCompletions(reply))
+        self.embeddings = SimpleNamespace(create=self._embed)
+
+    @staticmethod
+    async def _embed(**request):
+        raise RuntimeError("embeddings unavailable")
+
+
+def user_prompt(request):
+    """The user message of a chat completion request"""
+    return request["messages"][-1]["content"]
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    """Install a stub async client for every agent; call it with a reply function"""
+
+    def install(reply):
+        client = StubAsyncClient(reply)
+        for module in ("agents.summary_agent", "agents.action_agent", "agents.risk_agent"):
+            monkeypatch.setattr(f"{module}.get_async_client", lambda api_key, base_url=None: client)
+        return client
+
+    return install
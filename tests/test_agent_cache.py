@@ -0,0 +1,100 @@
+"""
+Tests for the shared two-tier agent result cache
+"""
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+
+from agents.cache import AgentCache
+
+
+def _probe(cache, text, embedding, context=None):
+    probe = cache._new_probe("summary", "model", text, context)
+    probe["embedding"] = cache._normalize(embedding)
+    return probe
+
+
+def test_exact_and_semantic_hits():
+    cache = AgentCache()
+    cache.store(_probe(cache, "doc", [1.0, 0.0]), {"summary": "S"})
+
+    assert cache._get(cache.make_key("summary", "model", "doc")) == {"summary": "S"}
+    assert cache._search(_probe(cache, "other doc", [0.99, 0.05])) == {"summary": "S"}
+    assert cache._search(_probe(cache, "unrelated", [0.0, 1.0])) is None
+
+
+def test_semantic_hits_need_the_same_context():
+    cache = AgentCache()
+    cache.store(_probe(cache, "chunk", [1.0, 0.0], {"summary": "Old plan"}), {"risks": ["A"]})
+
+    assert cache._search(_probe(cache, "chunk!", [1.0, 0.0], {"summary": "Old plan"})) == {"risks": ["A"]}
+    assert cache._search(_probe(cache, "chunk!", [1.0, 0.0], {"summary": "New plan"})) is None
+
+
+class _FlakyEmbeddings:
+    """Sync client whose embeddings endpoint fails on the first request"""
+
+    def __init__(self):
+        self.calls = 0
+        self.embeddings = SimpleNamespace(create=self._create)
+
+    def _create(self, **request):
+        self.calls += 1
+        if self.calls == 1:
+            raise ValueError("timeout")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0, 0.0])])
+
+
+def test_embeddings_resume_after_the_cooldown():
+    cache = AgentCache()
+    client = _FlakyEmbeddings()
+
+    cache.lookup("action", "model", "doc", None, client)
+    cache.lookup("action", "model", "doc", None, client)
+    assert client.calls == 1  # paused after the error
+
+    cache._embeddings_retry_at -= AgentCache.EMBEDDING_RETRY_SECONDS
+    _, probe = cache.lookup("action", "model", "doc", None, client)
+    assert client.calls == 2
+    assert probe["embedding"] is not None
+
+
+def test_results_are_copies():
+    cache = AgentCache()
+    probe = _probe(cache, "doc", [1.0, 0.0])
+    cache.store(probe, {"items": [1]})
+    cache._get(probe["key"])["items"].append(2)
+    assert cache._get(probe["key"]) == {"items": [1]}
+
+
+def test_oldest_entry_is_evicted():
+    cache = AgentCache(max_entries=2)
+    probes = [_probe(cache, f"doc {i}", [1.0, float(i)]) for i in range(3)]
+    for i, probe in enumerate(probes):
+        cache.store(probe, i)
+    assert cache._get(probes[0]["key"]) is None
+    assert cache._get(probes[2]["key"]) == 2
+
+
+def test_concurrent_store_and_search():
+    # Streamlit sessions share one cache; searches iterate while others store
+    cache = AgentCache(max_entries=64)
+    errors = []
+
+    def worker(offset):
+        rng = np.random.default_rng(offset)
+        try:
+            for i in range(300):
+                embedding = rng.random(8).tolist()
+                cache.store(_probe(cache, f"doc {offset}-{i}", embedding), i)
+                cache._search(_probe(cache, "query", embedding))
+        except Exception as e:  # pragma: no cover - only on a race
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
@@ -0,0 +1,79 @@
+"""
+Tests for the Action and Risk agents' concurrent per-chunk fan-out
+"""
+import asyncio
+
+from agents.action_agent import ActionAgent
+from agents.risk_agent import RiskAgent
+from utils import fast_json
+from conftest import user_prompt
+
+LLM_CONFIG = {"config_list": [{"api_key": "test-key", "model": "gpt-4o"}]}
+
+
+def _chunks(*texts):
+    return [{"chunk_id": i, "text": text} for i, text in enumerate(texts)]
+
+
+def _all_in_flight(count, answer):
+    """Reply only once `count` requests are open at the same time"""
+    arrived = []
+    everyone = asyncio.Event()
+
+    async def reply(request):
+        arrived.append(request)
+        if len(arrived) == count:
+            everyone.set()
+        await asyncio.wait_for(everyone.wait(), timeout=2)
+        return answer(request)
+
+    return reply
+
+
+def _action_answer(request):
+    prompt = user_prompt(request)
+    task = next(name for name in ("Alpha", "Beta", "Gamma") if f"{name} chunk" in prompt)
+    return fast_json.dumps([{"task": f"Ship {task}"}, {"task": "Book the review room"}])
+
+
+def test_action_chunks_run_concurrently_and_keep_chunk_order(stub_client):
+    stub_client(_all_in_flight(3, _action_answer))
+    agent = ActionAgent(LLM_CONFIG)
+    actions = asyncio.run(agent.aprocess_chunks(_chunks("Alpha chunk.", "Beta chunk.", "Gamma chunk.")))
+
+    # The repeated item from later chunks is dropped as a duplicate
+    assert [a["task"] for a in actions] == ["Ship Alpha", "Book the review room", "Ship Beta", "Ship Gamma"]
+
+
+def test_max_concurrency_bounds_in_flight_requests(stub_client):
+    in_flight = []
+    peak = []
+
+    async def reply(request):
+        in_flight.append(1)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.pop()
+        return _action_answer(request)
+
+    stub_client(reply)
+    agent = ActionAgent(LLM_CONFIG)
+    asyncio.run(agent.aprocess_chunks(_chunks("Alpha chunk.", "Beta chunk.", "Gamma chunk."), max_concurrency=2))
+    assert max(peak) == 2
+
+
+def test_risk_chunks_run_concurrently_and_merge(stub_client):
+    def answer(request):
+        name = "Alpha" if "Alpha chunk" in user_prompt(request) else "Beta"
+        return fast_json.dumps({
+            "open_questions": [f"Who owns {name}?"],
+            "assumptions": [],
+            "missing_data": [],
+            "risks": [{"title": f"{name} slips", "description": "Late", "severity": "high", "type": "timeline"}]
+        })
+
+    stub_client(_all_in_flight(2, answer))
+    result = asyncio.run(RiskAgent(LLM_CONFIG).aprocess_chunks(_chunks("Alpha chunk.", "Beta chunk.")))
+
+    assert result["open_questions"] == ["Who owns Alpha?", "Who owns Beta?"]
+    assert [r["title"] for r in result["risks"]] == ["Alpha slips", "Beta slips"]
@@ -0,0 +1,19 @@
+"""
+Tests for parsing non-streamed Action and Risk agent replies
+"""
+from agents.action_agent import ActionAgent
+from agents.risk_agent import RiskAgent
+
+LLM_CONFIG = {"config_list": [{"api_key": "test-key", "model": "gpt-4o"}]}
+
+
+def test_action_reply_with_bracketed_prose():
+    agent = ActionAgent(LLM_CONFIG)
+    actions = agent._extract_json('Sure [note]: [{"task": "Ship it", "owner": "Ann"}]')
+    assert [(a["task"], a["owner"]) for a in actions] == [("Ship it", "Ann")]
+
+
+def test_risk_reply_with_bracketed_prose():
+    agent = RiskAgent(LLM_CONFIG)
+    result = agent._extract_json('Sure [note]: {"open_questions": ["Budget?"], "risks": []}')
+    assert result["open_questions"] == ["Budget?"]
@@ -0,0 +1,43 @@
+"""
+Tests for near-duplicate detection of action items and risks
+"""
+from agents.action_agent import ActionAgent
+from agents.risk_agent import RiskAgent
+from utils.dedup import is_near_duplicate, jaccard, word_shingles
+
+LLM_CONFIG = {"config_list": [{"api_key": "test-key", "model": "gpt-4o"}]}
+
+
+def test_added_article_is_a_duplicate():
+    assert is_near_duplicate(word_shingles("Review PR"), [word_shingles("Review the PR")])
+
+
+def test_case_and_punctuation_are_ignored():
+    assert word_shingles("Review the PR!") == word_shingles("review pr")
+
+
+def test_changed_word_is_not_a_duplicate():
+    assert not is_near_duplicate(
+        word_shingles("Send report to Alice"), [word_shingles("Send report to Bob")]
+    )
+
+
+def test_jaccard_of_empty_sets():
+    assert jaccard(frozenset(), frozenset()) == 1.0
+    assert jaccard(frozenset({"a"}), frozenset()) == 0.0
+
+
+def test_action_agent_collapses_article_variants():
+    agent = ActionAgent(LLM_CONFIG)
+    actions = [
+        {"task": "Review the PR", "owner": "Bob"},
+        {"task": "Review PR", "owner": "Bob"},
+        {"task": "Deploy the release", "owner": "Ann"},
+    ]
+    assert [a["task"] for a in agent._deduplicate_actions(actions)] == ["Review the PR", "Deploy the release"]
+
+
+def test_risk_agent_collapses_article_variants():
+    agent = RiskAgent(LLM_CONFIG)
+    risks = [{"title": "Delay in the vendor contract"}, {"title": "Delay in vendor contract"}]
+    assert agent._deduplicate_risks(risks) == risks[:1]
@@ -0,0 +1,105 @@
+"""
+Tests for document cleaning and chunking
+"""
+import io
+import random
+import re
+
+import pytest
+
+from utils.document_processor import DocumentProcessor, _chunk_spans, get_encoding
+
+
+@pytest.fixture
+def processor():
+    try:
+        get_encoding("cl100k_base")
+    except Exception as e:  # the BPE file is downloaded on first use
+        pytest.skip(f"cl100k_base encoding unavailable: {e}")
+    return DocumentProcessor(chunk_size=20, chunk_overlap=5)
+
+
+def test_special_token_text_is_counted_not_rejected(processor):
+    processed = processor.process_document("Hello <|endoftext|> world. " * 20)
+    assert processed["metadata"]["total_tokens"] > 0
+    assert processed["requires_chunking"]
+
+
+@pytest.mark.parametrize("counts, chunk_size, chunk_overlap", [
+    ([3] * 10, 10, 4),
+    ([5, 5, 5, 5], 10, 6),
+    ([1, 7, 2, 9, 4, 4, 6, 1, 8], 12, 5),
+    ([4] * 10, 12, 4),
+])
+def test_chunk_spans_overlap_and_cover_every_sentence(counts, chunk_size, chunk_overlap):
+    spans = _chunk_spans(counts, chunk_size, chunk_overlap)
+    assert spans[0][0] == 0 and spans[-1][1] == len(counts)
+    assert all(tokens == sum(counts[start:end]) <= chunk_size for start, end, tokens in spans)
+    for (start, end, _), (next_start, next_end, _) in zip(spans, spans[1:]):
+        assert start < next_start <= end < next_end
+        # The overlap reaches chunk_overlap unless that would keep the whole
+        # chunk or overflow the next one
+        overlap = sum(counts[next_start:end])
+        assert (
+            overlap >= chunk_overlap
+            or next_start == start + 1
+            or overlap + counts[next_start - 1] + counts[end] > chunk_size
+        )
+
+
+def test_chunk_spans_sum_overlap_back_from_the_chunk_end():
+    # 4-token overlap needs two 3-token sentences from the end of each chunk
+    assert _chunk_spans([3] * 6, 10, 4) == [(0, 3, 9), (1, 4, 9), (2, 5, 9), (3, 6, 9)]
+    assert _chunk_spans([4] * 10, 12, 4) == [(0, 3, 12), (2, 5, 12), (4, 7, 12), (6, 9, 12), (8, 10, 8)]
+
+
+def test_chunk_spans_without_overlap():
+    assert _chunk_spans([3] * 6, 10, 0) == [(0, 3, 9), (3, 6, 9)]
+
+
+def test_oversized_sentence_gets_its_own_chunk():
+    assert _chunk_spans([50, 3, 3], 10, 2) == [(0, 1, 50), (1, 3, 6)]
+
+
+def test_chunk_spans_of_no_sentences():
+    assert _chunk_spans([], 10, 2) == []
+
+
+def _regex_sentences(text):
+    """The regex splitter chunk_by_sentences replaced"""
+    return [s.strip() for s in re.split(r'(?<=[.!?])\s+', text) if s.strip()]
+
+
+@pytest.mark.parametrize("text", [
+    "One. Two! Three? Four",
+    "Wait... what?! Really?!  Yes.",
+    "Tabs.\tNewlines.\nBoth.\r\n\t Done.",
+    "No terminal punctuation here",
+    "Ends with punctuation.",
+    "Trailing space after the end.   ",
+    "  Leading space. And e.g. abbreviations v1.2 stay together.",
+    "...!?",
+    "",
+    "?! .",
+])
+def test_sentence_scan_matches_the_regex(text):
+    assert DocumentProcessor().chunk_by_sentences(text) == _regex_sentences(text)
+
+
+def test_sentence_scan_matches_the_regex_on_random_text():
+    rng = random.Random(0)
+    processor = DocumentProcessor()
+    for _ in range(2000):
+        text = "".join(rng.choice("ab .!?\t\n") for _ in range(rng.randrange(40)))
+        assert processor.chunk_by_sentences(text) == _regex_sentences(text), repr(text)
+
+
+def test_pdf_falls_back_to_pypdf2_when_pdfium_fails(monkeypatch):
+    processor = DocumentProcessor()
+
+    def pdfium_error(data):
+        raise RuntimeError("Failed to load document (PDFium: Incorrect password error)")
+
+    monkeypatch.setattr(processor, "_pdf_pages_pdfium", pdfium_error)
+    monkeypatch.setattr(processor, "_pdf_pages_pypdf2", lambda data: ["page one", "page two"])
+    assert processor.read_pdf(io.BytesIO(b"%PDF-1.7")) == "page one\npage two\n"
@@ -0,0 +1,32 @@
+"""
+Tests for the orjson-backed JSON helpers
+"""
+import json
+
+import pytest
+
+from utils import fast_json
+
+
+def test_decode_prefix_stops_at_the_end_of_the_value():
+    text = 'x {"a": [1, "]"]} trailing prose'
+    value, end = fast_json.decode_prefix(text, 2)
+    assert value == {"a": [1, "]"]}
+    assert text[end:] == " trailing prose"
+
+
+def test_decode_prefix_rejects_an_unfinished_value():
+    with pytest.raises(fast_json.JSONDecodeError):
+        fast_json.decode_prefix('[{"a": 1}', 0)
+
+
+def test_dumps_and_loads_round_trip_unicode():
+    obj = {"task": "Réviser le budget", "deps": ["Ann"]}
+    assert fast_json.loads(fast_json.dumps(obj)) == obj
+    assert "Réviser" in fast_json.dumps(obj)
+
+
+def test_dumpb_matches_stdlib_layout():
+    obj = {"a": [1, 2], "b": "ü"}
+    assert fast_json.dumpb(obj) == json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    assert fast_json.dumpb(obj, indent=True) == json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,209 @@
+"""
+Tests for the agent DAG run by DocumentOrchestrator, using a stub API client
+"""
+import asyncio
+
+import pytest
+
+from agents.orchestrator import DocumentOrchestrator
+from utils import fast_json
+from utils.config import Config
+from conftest import user_prompt
+
+ENV = {
+    "OPENAI_API_KEY": "test-key",
+    "USE_OPENROUTER": "false",
+    "MODEL_NAME": "gpt-4o",
+    "ENABLE_CACHE": "false",
+    "STREAM_RESPONSES": "false",
+    "STRUCTURED_OUTPUT": "false",
+    "RATE_LIMIT_RPM": "0",
+    "RATE_LIMIT_TPM": "0",
+    "SUMMARY_PACK_TOKENS": "0",
+    "SUMMARY_FINGERPRINT": "false",
+    "COMPRESS_RATIO": "1.0",
+    "FUSED_MODE": "false",
+    "RISK_MIN_WORDS": "0",
+}
+
+SUMMARY = {"summary": "Launch plan", "key_decisions": ["Ship Friday"], "constraints": [], "intent": "Plan"}
+ACTIONS = [{"task": "Write release notes", "owner": "Ann"}]
+RISKS = {"open_questions": [], "assumptions": [], "missing_data": [], "risks": [
+    {"title": "Tight deadline", "description": "Friday is close", "severity": "high", "type": "timeline"}
+]}
+
+
+def _agent_of(request):
+    """Which agent sent a request, from its system message"""
+    system = request["messages"][0]["content"]
+    for prefix, agent in (
+        ("You are a Summary Agent", "summary"),
+        ("You are an Action Extraction Agent", "action"),
+        ("You are a Risk Analysis Agent", "risk"),
+        ("You are a Document Analysis Agent", "fused"),
+    ):
+        if system.startswith(prefix):
+            return agent
+    raise AssertionError(f"unexpected system message: {system[:40]}")
+
+
+def _default_reply(request):
+    return fast_json.dumps({"summary": SUMMARY, "action": ACTIONS, "risk": RISKS}[_agent_of(request)])
+
+
+def _processed(*texts, total_words=500):
+    chunks = [{"chunk_id": i, "text": text, "tokens": 50, "is_complete_document": len(texts) == 1}
+              for i, text in enumerate(texts)]
+    return {
+        "cleaned_text": " ".join(texts),
+        "chunks": chunks,
+        "num_chunks": len(chunks),
+        "requires_chunking": len(chunks) > 1,
+        "metadata": {"total_words": total_words, "total_tokens": 50 * len(chunks)},
+    }
+
+
+@pytest.fixture
+def make_orchestrator(monkeypatch):
+    """Build an orchestrator from ENV plus overrides, with a canned processed document"""
+
+    def make(processed=None, **env):
+        for name, value in {**ENV, **env}.items():
+            monkeypatch.setenv(name, value)
+        orchestrator = DocumentOrchestrator(Config())
+        if processed is not None:
+            monkeypatch.setattr(orchestrator.document_processor, "process_document", lambda text: processed)
+        return orchestrator
+
+    return make
+
+
+def test_summary_runs_first_then_action_and_risk_together(make_orchestrator, stub_client):
+    started = []
+    both_started = asyncio.Event()
+
+    async def reply(request):
+        agent = _agent_of(request)
+        started.append(agent)
+        if agent != "summary":
+            # Each downstream call waits for the other, so running them
+            # one after the other would time out
+            if {"action", "risk"} <= set(started):
+                both_started.set()
+            await asyncio.wait_for(both_started.wait(), timeout=2)
+        return _default_reply(request)
+
+    stub_client(reply)
+    orchestrator = make_orchestrator(_processed("We ship on Friday. Ann writes the notes."))
+    events = []
+    result = asyncio.run(orchestrator.aprocess_document("doc", lambda agent, status: events.append((agent, status))))
+
+    assert started[0] == "summary" and sorted(started[1:]) == ["action", "risk"]
+    assert events.index(("summary", "complete")) < events.index(("action", "processing"))
+    assert result["summary"]["summary"] == "Launch plan"
+    assert [a["task"] for a in result["actions"]] == ["Write release notes"]
+    assert [r["title"] for r in result["risks"]["risks"]] == ["Tight deadline"]
+    assert result["metadata"]["num_chunks"] == 1
+
+
+def test_downstream_agents_get_the_summary_as_context(make_orchestrator, stub_client):
+    client = stub_client(_default_reply)
+    asyncio.run(make_orchestrator(_processed("We ship on Friday.")).aprocess_document("doc"))
+
+    downstream = [r for r in client.chat.completions.calls if _agent_of(r) != "summary"]
+    assert len(downstream) == 2
+    assert all("Ship Friday" in user_prompt(r) for r in downstream)
+
+
+def test_unique_chunks_keep_the_first_copy_in_order(make_orchestrator):
+    chunks = _processed("Header.", "Body one.", "Header.", "Body two.")["chunks"]
+    unique = make_orchestrator()._unique_chunks(chunks)
+    assert [(c["chunk_id"], c["text"]) for c in unique] == [(0, "Header."), (1, "Body one."), (3, "Body two.")]
+
+
+@pytest.mark.parametrize("min_words, text, words, expected", [
+    ("0", "Short note.", 2, True),
+    ("100", "A long enough document.", 150, True),
+    ("100", "Can we ship Friday?", 4, True),
+    ("100", "Open issue with the vendor.", 5, True),
+    ("100", "Lunch is at noon.", 4, False),
+])
+def test_needs_risk_analysis(make_orchestrator, min_words, text, words, expected):
+    orchestrator = make_orchestrator(RISK_MIN_WORDS=min_words)
+    assert orchestrator._needs_risk_analysis(_processed(text, total_words=words)) is expected
+
+
+def test_triaged_document_skips_the_risk_agent(make_orchestrator, stub_client):
+    client = stub_client(_default_reply)
+    orchestrator = make_orchestrator(_processed("Lunch is at noon.", total_words=4), RISK_MIN_WORDS="100")
+    result = asyncio.run(orchestrator.aprocess_document("doc"))
+
+    assert sorted(_agent_of(r) for r in client.chat.completions.calls) == ["action", "summary"]
+    assert result["risks"]["risks"] == []
+
+
+def test_fused_mode_answers_in_one_request(make_orchestrator, stub_client):
+    fused = {**SUMMARY, "actions": ACTIONS, **RISKS}
+    client = stub_client(lambda request: fast_json.dumps(fused))
+    orchestrator = make_orchestrator(_processed("We ship on Friday."), FUSED_MODE="true")
+    result = asyncio.run(orchestrator.aprocess_document("doc"))
+
+    assert len(client.chat.completions.calls) == 1
+    assert result["summary"]["summary"] == "Launch plan"
+    assert [a["task"] for a in result["actions"]] == ["Write release notes"]
+
+
+def test_truncated_fused_response_falls_back_to_the_agents(make_orchestrator, stub_client):
+    def reply(request):
+        if _agent_of(request) == "fused":
+            return '{"summary": "Launch', "length"
+        return _default_reply(request)
+
+    client = stub_client(reply)
+    orchestrator = make_orchestrator(_processed("We ship on Friday."), FUSED_MODE="true")
+    result = asyncio.run(orchestrator.aprocess_document("doc"))
+
+    assert sorted(_agent_of(r) for r in client.chat.completions.calls) == ["action", "fused", "risk", "summary"]
+    assert result["summary"]["summary"] == "Launch plan"
+    assert [r["title"] for r in result["risks"]["risks"]] == ["Tight deadline"]
+
+
+def test_fused_mode_is_not_used_for_several_chunks(make_orchestrator, stub_client):
+    client = stub_client(_default_reply)
+    orchestrator = make_orchestrator(_processed("Part one.", "Part two."), FUSED_MODE="true")
+    asyncio.run(orchestrator.aprocess_document("doc"))
+    assert "fused" not in {_agent_of(r) for r in client.chat.completions.calls}
+
+
+def test_documents_keep_their_own_results(make_orchestrator, stub_client, monkeypatch):
+    def reply(request):
+        agent = _agent_of(request)
+        prompt = user_prompt(request)
+        if agent == "summary":
+            return fast_json.dumps({**SUMMARY, "summary": "Alpha" if "alpha" in prompt else "Beta"})
+        if agent == "action":
+            return fast_json.dumps([{"task": "Do alpha" if "alpha" in prompt else "Do beta"}])
+        return _default_reply(request)
+
+    stub_client(reply)
+    orchestrator = make_orchestrator()
+    docs = {"alpha plan.": _processed("alpha plan."), "beta plan.": _processed("beta plan.")}
+    monkeypatch.setattr(orchestrator.document_processor, "process_document", lambda text: docs[text])
+    results = asyncio.run(orchestrator.aprocess_documents(["alpha plan.", "beta plan."]))
+
+    assert [r["summary"]["summary"] for r in results] == ["Alpha", "Beta"]
+    assert [r["actions"][0]["task"] for r in results] == ["Do alpha", "Do beta"]
+
+
+def test_streaming_results_are_tasks(make_orchestrator, stub_client):
+    stub_client(_default_reply)
+    orchestrator = make_orchestrator(_processed("We ship on Friday."))
+
+    async def run():
+        tasks = await orchestrator.aprocess_document_streaming("doc")
+        return await tasks["summary"], await tasks["actions"], await tasks["risks"]
+
+    summary, actions, risks = asyncio.run(run())
+    assert summary["summary"] == "Launch plan"
+    assert [a["task"] for a in actions] == ["Write release notes"]
+    assert [r["title"] for r in risks["risks"]] == ["Tight deadline"]
@@ -0,0 +1,42 @@
+"""
+Tests for result formatting and export
+"""
+import csv
+import io
+
+import pytest
+
+from utils.output_formatter import OutputFormatter
+
+ACTIONS = [
+    {"task": "Review budget, then sign", "owner": None, "deadline": "Friday", "dependencies": ["Legal", "Finance"]},
+    {"task": 'Quote "as is"'},
+    {"task": "Two\nlines", "owner": "Bob", "dependencies": []},
+]
+
+
+def _rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+def test_arrow_csv_parses_to_the_pandas_rows():
+    pytest.importorskip("pyarrow")
+    arrow_csv = OutputFormatter._actions_csv_arrow(ACTIONS).decode("utf-8")
+    pandas_csv = OutputFormatter.format_actions_as_dataframe(ACTIONS).to_csv(index=False)
+    assert _rows(arrow_csv) == _rows(pandas_csv)
+
+
+def test_csv_export_columns_and_defaults():
+    rows = _rows(OutputFormatter.export_actions_to_csv(ACTIONS))
+    assert rows[0] == OutputFormatter.ACTION_COLUMNS
+    assert rows[1] == ["Review budget, then sign", "", "Friday", "Legal, Finance"]
+    assert rows[2] == ['Quote "as is"', "Not specified", "Not specified", "None"]
+
+
+def test_csv_export_falls_back_for_non_string_fields():
+    rows = _rows(OutputFormatter.export_actions_to_csv([{"task": "Ship", "deadline": 5}]))
+    assert rows[1] == ["Ship", "Not specified", "5", "None"]
+
+
+def test_empty_csv_export_has_header_only():
+    assert _rows(OutputFormatter.export_actions_to_csv([])) == [OutputFormatter.ACTION_COLUMNS]
@@ -0,0 +1,27 @@
+"""
+Tests that the static system prompts stay long enough for automatic prompt caching
+"""
+import pytest
+
+from agents.action_agent import ActionAgent
+from agents.risk_agent import RiskAgent
+from utils.prompt_caching import AUTOMATIC_CACHE_MIN_TOKENS
+
+# Headroom so that small prompt edits don't silently drop below the threshold
+MARGIN_TOKENS = 150
+
+
+def _encoding(name):
+    tiktoken = pytest.importorskip("tiktoken")
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:  # the BPE file is downloaded on first use
+        pytest.skip(f"{name} encoding unavailable: {e}")
+
+
+@pytest.mark.parametrize("encoding_name", ["cl100k_base", "o200k_base"])
+@pytest.mark.parametrize("agent_class", [ActionAgent, RiskAgent])
+def test_cached_prefix_clears_threshold(agent_class, encoding_name):
+    prefix = agent_class.SYSTEM_MESSAGE + agent_class.FEW_SHOT_EXAMPLES
+    tokens = len(_encoding(encoding_name).encode(prefix))
+    assert tokens >= AUTOMATIC_CACHE_MIN_TOKENS + MARGIN_TOKENS
@@ -0,0 +1,54 @@
+"""
+Tests for the client-side token bucket
+"""
+import asyncio
+import time
+
+from utils.ratelimit import TokenBucket, get_rate_limiter
+
+
+def test_no_limits_means_no_limiter():
+    assert get_rate_limiter("key", "gpt-4o") is None
+    assert get_rate_limiter("key", "gpt-4o", rpm=60) is get_rate_limiter("key", "gpt-4o", rpm=60)
+
+
+def test_wait_consumes_the_budget():
+    bucket = TokenBucket(rpm=2, tpm=1000)
+    asyncio.run(bucket.wait(300))
+    assert bucket._available_requests < 1.1
+    assert bucket._available_tokens < 701
+
+
+def test_oversized_request_is_capped_at_the_whole_budget():
+    bucket = TokenBucket(tpm=100)
+    asyncio.run(asyncio.wait_for(bucket.wait(10_000), timeout=1))
+    assert bucket._available_tokens < 1
+
+
+def test_wait_blocks_until_the_budget_refills():
+    bucket = TokenBucket(rpm=600)  # one request per 0.1s
+    bucket._available_requests = 0.0
+    started = time.monotonic()
+    asyncio.run(bucket.wait())
+    assert time.monotonic() - started >= 0.05
+
+
+def test_observe_lowers_budgets_to_reported_remaining():
+    bucket = TokenBucket(rpm=100, tpm=10_000)
+    bucket.observe({"x-ratelimit-remaining-requests": "3", "x-ratelimit-remaining-tokens": "bad"})
+    assert bucket._available_requests <= 3
+    assert bucket._available_tokens > 9000
+
+
+def test_observe_reads_the_openrouter_header():
+    bucket = TokenBucket(rpm=100)
+    bucket.observe({"x-ratelimit-remaining": "5"})
+    assert bucket._available_requests <= 5
+
+
+def test_pause_delays_every_request():
+    bucket = TokenBucket(rpm=100)
+    bucket.pause(30)
+    assert bucket._wait_time(0) > 29
+    bucket.pause(1)  # a shorter pause never cuts an existing one short
+    assert bucket._wait_time(0) > 29
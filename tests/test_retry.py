@@ -0,0 +1,82 @@
+"""
+Tests for the retry helpers that own the API retry policy
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils.openai_client import get_async_client, get_client
+from utils.retry import acall_with_retry, call_with_retry, retry_after
+
+
+class _ServerError(Exception):
+    status_code = 503
+
+
+class _BadRequest(Exception):
+    status_code = 400
+
+
+def _flaky(failures, error=_ServerError):
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error()
+        return "ok"
+
+    return func, calls
+
+
+def test_retries_transient_errors():
+    func, calls = _flaky(2)
+    assert call_with_retry(func, base_delay=0) == "ok"
+    assert len(calls) == 3
+
+
+def test_gives_up_after_max_retries():
+    func, calls = _flaky(5)
+    with pytest.raises(_ServerError):
+        call_with_retry(func, max_retries=2, base_delay=0)
+    assert len(calls) == 3
+
+
+def test_does_not_retry_client_errors():
+    func, calls = _flaky(1, _BadRequest)
+    with pytest.raises(_BadRequest):
+        call_with_retry(func, base_delay=0)
+    assert len(calls) == 1
+
+
+def test_async_retries_transient_errors():
+    func, calls = _flaky(1)
+
+    async def afunc():
+        return func()
+
+    assert asyncio.run(acall_with_retry(afunc, base_delay=0)) == "ok"
+    assert len(calls) == 2
+
+
+def test_retry_after_headers():
+    def error(headers):
+        e = Exception()
+        e.response = SimpleNamespace(headers=headers)
+        return e
+
+    assert retry_after(error({"retry-after-ms": "1500"})) == 1.5
+    assert retry_after(error({"retry-after": "2"})) == 2.0
+    assert retry_after(error({"retry-after": "Wed, 21 Oct 2015 07:28:00 GMT"})) is None
+    assert retry_after(Exception()) is None
+
+
+def test_sdk_retries_are_disabled():
+    # Retries here would multiply with call_with_retry's own attempts
+    assert get_client("test-key").max_retries == 0
+
+    async def async_max_retries():
+        return get_async_client("test-key").max_retries
+
+    assert asyncio.run(async_max_retries()) == 0
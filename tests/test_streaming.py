@@ -0,0 +1,92 @@
+"""
+Tests for the streamed-response JSON helpers
+"""
+import pytest
+
+from utils.streaming import JsonArrayItemScanner, JsonObjectScanner, JsonStreamAccumulator, extract_json
+
+
+def _feed_all(parts):
+    scanner = JsonArrayItemScanner()
+    items = []
+    for part in parts:
+        items.extend(scanner.feed(part))
+    return items
+
+
+def _add_until_parsed(parts):
+    accumulator = JsonStreamAccumulator()
+    for part in parts:
+        parsed = accumulator.add(part)
+        if parsed is not None:
+            return parsed
+    return None
+
+
+def test_accumulator_skips_bracketed_prose():
+    assert _add_until_parsed(['Sure [note] here: ', '[{"a":1}]']) == [{"a": 1}]
+
+
+def test_accumulator_starts_after_fence():
+    assert _add_until_parsed(['Here [1] you go\n```json\n', '{"x": [1]}']) == {"x": [1]}
+
+
+def test_accumulator_waits_for_the_whole_array():
+    accumulator = JsonStreamAccumulator()
+    assert accumulator.add('[{"a":1}') is None
+    assert accumulator.add(', {"b":2}]') == [{"a": 1}, {"b": 2}]
+
+
+def test_accumulator_ignores_brackets_inside_unfinished_strings():
+    assert _add_until_parsed(['{"a": "see [1]']) is None
+
+
+def test_scanner_skips_bracketed_prose():
+    items = _feed_all(['Sure [note] here: ', '[{"a":1}, {"b":', '[2]}]'])
+    assert items == ['{"a":1}', '{"b":[2]}']
+
+
+def test_scanner_splits_items_across_chunks():
+    items = _feed_all(['```json\n[{"task": "a, ', 'b"}', ', {"task": "c"}]\n```'])
+    assert items == ['{"task": "a, b"}', '{"task": "c"}']
+
+
+def test_scanner_ignores_brackets_and_escaped_quotes_in_strings():
+    items = _feed_all(['[{"t": "x \\"}]\\" [y]"}', ']'])
+    assert items == ['{"t": "x \\"}]\\" [y]"}']
+
+
+def test_scanner_yields_nothing_for_an_empty_array():
+    assert _feed_all(['[', ']']) == []
+
+
+def test_accumulator_rejects_a_value_followed_by_more_text():
+    accumulator = JsonStreamAccumulator()
+    assert accumulator.add('{"a": 1} and then') is None
+    assert accumulator.add(' {"b": 2}') == {"b": 2}
+
+
+def test_object_scanner_returns_the_first_object():
+    scanner = JsonObjectScanner()
+    assert scanner.feed('Result: {"a": "}", ') is None
+    assert scanner.feed('"b": {"c": 1}} extra') == '{"a": "}", "b": {"c": 1}}'
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Sure [note]: [{"a": 1}]', [{"a": 1}]),
+    ('See [1] and {x}: {"a": [1]}', {"a": [1]}),
+    ('Here [1] you go\n```json\n[{"a": 1}]\n```\nDone.', [{"a": 1}]),
+    ('[{"a": 1}] Hope this helps [2].', [{"a": 1}]),
+    ('[]', []),
+])
+def test_extract_json_skips_bracketed_prose(text, expected):
+    assert extract_json(text) == expected
+
+
+def test_extract_json_limited_to_objects():
+    assert extract_json('Risks [draft]: {"risks": []}', "{") == {"risks": []}
+
+
+def test_extract_json_without_json():
+    with pytest.raises(ValueError):
+        extract_json("Sorry [no data].")
@@ -0,0 +1,135 @@
+"""
+Tests for the Summary agent's chunk fan-out, packing and caching
+"""
+import asyncio
+
+from agents.summary_agent import SummaryAgent
+from utils import fast_json
+from utils.summary_cache import SummaryCache
+from conftest import user_prompt
+
+LLM_CONFIG = {"config_list": [{"api_key": "test-key", "model": "gpt-4o"}]}
+
+
+def _summary(text):
+    return fast_json.dumps({"summary": text, "key_decisions": [], "constraints": [], "intent": "Plan"})
+
+
+def _agent(**options):
+    return SummaryAgent({**LLM_CONFIG, **options})
+
+
+def _chunks(*texts):
+    return [{"chunk_id": i, "text": text, "tokens": 10} for i, text in enumerate(texts)]
+
+
+def _sizes(packs):
+    return [[chunk["tokens"] for chunk in pack] for pack in packs]
+
+
+def _sized_chunks(*tokens):
+    return [{"chunk_id": i, "text": f"Chunk {i}.", "tokens": n} for i, n in enumerate(tokens)]
+
+
+def test_disk_cache_is_saved_once_per_document(stub_client, tmp_path, monkeypatch):
+    stub_client(lambda request: _summary("part"))
+    agent = _agent(enable_cache=True, summary_cache_dir=str(tmp_path), summary_pack_tokens=0)
+    saves = []
+    save = agent.cache.save
+    monkeypatch.setattr(agent.cache, "save", lambda: saves.append(1) or save())
+
+    asyncio.run(agent.aprocess_chunks(_chunks("One.", "Two.", "Three.")))
+
+    assert len(saves) == 1
+    assert len(fast_json.loads((tmp_path / "summary_cache.json").read_bytes())) == 3
+
+
+def test_summary_cache_only_writes_after_changes(tmp_path):
+    cache = SummaryCache(str(tmp_path))
+    cache.save()
+    assert not (tmp_path / SummaryCache.FILENAME).exists()
+    cache.put("key", {"summary": "S"})
+    cache.save()
+    assert SummaryCache(str(tmp_path)).get("key") == {"summary": "S"}
+
+
+def test_chunks_are_summarized_concurrently(stub_client):
+    arrived = []
+    everyone = asyncio.Event()
+
+    async def reply(request):
+        prompt = user_prompt(request)
+        if "summaries from each part" in prompt:
+            return _summary("synthesis")
+        # Hold each chunk request until all three are open at once
+        arrived.append(prompt)
+        if len(arrived) == 3:
+            everyone.set()
+        await asyncio.wait_for(everyone.wait(), timeout=2)
+        return _summary("part")
+
+    client = stub_client(reply)
+    result = asyncio.run(_agent(summary_pack_tokens=0).aprocess_chunks(_chunks("One.", "Two.", "Three.")))
+
+    assert len(client.chat.completions.calls) == 4
+    assert result["summary"] == "synthesis"
+
+
+def test_pack_chunks_fills_each_request_budget():
+    agent = _agent(summary_pack_tokens=1000)
+    packs = agent._pack_chunks(_sized_chunks(400, 400, 400, 400), sys_tokens=0, resp_buffer=0)
+    assert _sizes(packs) == [[400, 400], [400, 400]]
+
+
+def test_pack_chunks_folds_a_slightly_oversized_tail():
+    agent = _agent(summary_pack_tokens=1000)
+    chunks = _sized_chunks(500, 480, 30)
+    # 1010 tokens is within 1000 / 0.95, so one request covers all three
+    assert _sizes(agent._pack_chunks(chunks, sys_tokens=0, resp_buffer=0)) == [[500, 480, 30]]
+    assert _sizes(agent._pack_chunks(chunks, sys_tokens=0, resp_buffer=0, merge_threshold=1.0)) == [[500, 480], [30]]
+
+
+def test_pack_chunks_leaves_a_large_tail_alone():
+    agent = _agent(summary_pack_tokens=1000)
+    packs = agent._pack_chunks(_sized_chunks(600, 300, 200), sys_tokens=0, resp_buffer=0)
+    assert _sizes(packs) == [[600, 300], [200]]
+
+
+def test_summary_list_must_match_the_chunk_count():
+    agent = _agent()
+    two = fast_json.dumps([{"summary": "A"}, {"summary": "B"}])
+    assert [s["summary"] for s in agent._extract_summary_list(f"Here:\n{two}", 2)] == ["A", "B"]
+    assert agent._extract_summary_list(f"Here:\n{two}", 3) is None
+    assert agent._extract_summary_list('[{"summary": "A"}, "B"]', 2) is None
+    assert agent._extract_summary_list("no list", 1) is None
+
+
+def test_mismatched_pack_falls_back_to_one_request_per_chunk(stub_client):
+    def reply(request):
+        prompt = user_prompt(request)
+        if "CHUNK 0" in prompt:
+            return fast_json.dumps([{"summary": "only one"}])
+        return _summary("single " + ("one" if "One." in prompt else "two"))
+
+    client = stub_client(reply)
+    summaries = asyncio.run(_agent()._asummarize_pack(_chunks("One.", "Two.")))
+
+    assert [s["summary"] for s in summaries] == ["single one", "single two"]
+    assert len(client.chat.completions.calls) == 3
+
+
+def test_repeated_chunks_share_one_summary(stub_client):
+    def reply(request):
+        prompt = user_prompt(request)
+        if "summaries from each part" in prompt:
+            return _summary("synthesis")
+        return _summary("header" if "Header." in prompt else "body")
+
+    client = stub_client(reply)
+    result = asyncio.run(_agent(summary_pack_tokens=0).aprocess_chunks(_chunks("Header.", "Body.", "Header.")))
+
+    prompts = [user_prompt(r) for r in client.chat.completions.calls]
+    assert sum("DOCUMENT:\nHeader." in p for p in prompts) == 1
+    synthesis = prompts[-1]
+    assert synthesis.count('"header"') == 2 and synthesis.count('"body"') == 1
+    assert result["summary"] == "synthesis"
@@ -1,13 +1,25 @@
 """
 Utility modules for document processing and configuration
 """
+import importlib
 
 from .config import Config
-from .document_processor import DocumentProcessor
-from .output_formatter import OutputFormatter
 
 __all__ = [
     'Config',
     'DocumentProcessor',
     'OutputFormatter'
 ]
+
+# Heavier utilities (tokenizer, PDF/DOCX readers, pandas) are imported on first
+# access, so importing a light helper such as utils.fast_json doesn't load them
+_LAZY_EXPORTS = {
+    'DocumentProcessor': '.document_processor',
+    'OutputFormatter': '.output_formatter',
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_EXPORTS:
+        return getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
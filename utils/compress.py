@@ -0,0 +1,52 @@
+"""
+Cheap local extractive compression of chunk text before it is sent to agents
+"""
+import math
+import re
+from collections import Counter
+from typing import List
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"\w+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences on terminal punctuation"""
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text) if s.strip()]
+
+
+def compress(text: str, ratio: float = 0.4) -> str:
+    """
+    Keep the most informative sentences of a text
+
+    Sentences are scored by their mean TF-IDF weight, treating each sentence
+    as a document, and the top-scoring ones are returned in original order.
+
+    Args:
+        text: Text to compress
+        ratio: Fraction of sentences to keep (0-1]
+
+    Returns:
+        Compressed text, or the original text if there is nothing to drop
+    """
+    sentences = split_sentences(text)
+    keep = max(1, math.ceil(len(sentences) * ratio))
+    if keep >= len(sentences):
+        return text
+
+    term_counts = [Counter(_WORD_RE.findall(s.lower())) for s in sentences]
+    doc_freq = Counter(term for counts in term_counts for term in counts)
+    n = len(sentences)
+    # Smoothed idf, as in sklearn's TfidfVectorizer default
+    idf = {term: math.log((1 + n) / (1 + df)) + 1 for term, df in doc_freq.items()}
+
+    scores = []
+    for counts in term_counts:
+        total = sum(counts.values())
+        if not total:
+            scores.append(0.0)
+            continue
+        scores.append(sum(count * idf[term] for term, count in counts.items()) / total)
+
+    top = sorted(range(n), key=lambda i: scores[i], reverse=True)[:keep]
+    return " ".join(sentences[i] for i in sorted(top))
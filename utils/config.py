@@ -1,16 +1,25 @@
 """
 Configuration management for the multi-agent system
 """
+import logging
 import os
 from dotenv import load_dotenv
+from functools import lru_cache
 from typing import Dict, Any
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class Config:
-    """Central configuration class for the application"""
+    """
+    Central configuration class for the application
+    
+    Settings are read from the environment once and are read-only afterwards;
+    use get_config() for the shared instance instead of re-reading per rerun.
+    """
     
     def __init__(self):
         """Initialize configuration from environment variables"""
@@ -28,12 +37,49 @@ class Config:
         
         # Force switch if using known problematic models
         if 'stepfun' in self.model_name or 'phi-3' in self.model_name:
-            print(f"[Config] Detected problematic model '{self.model_name}'. Auto-switching to Gemini 2.0 Flash.")
+            logger.warning("Detected problematic model '%s'. Auto-switching to Gemini 2.0 Flash.", self.model_name)
             self.model_name = 'google/gemini-2.0-flash-exp:free'
             
         self.max_tokens = int(os.getenv('MAX_TOKENS', '4096'))
         self.temperature = float(os.getenv('TEMPERATURE', '0.7'))
         
+        # Maximum number of concurrent API calls per agent when processing chunks
+        self.max_concurrency = int(os.getenv('MAX_CONCURRENCY', '8'))
+        
+        # Client-side rate limits shared by all agents on the same key and model
+        # (0 disables the limit); set to the provider's RPM/TPM ceilings
+        self.rate_limit_rpm = int(os.getenv('RATE_LIMIT_RPM', '0'))
+        self.rate_limit_tpm = int(os.getenv('RATE_LIMIT_TPM', '0'))
+        
+        # Stream agent responses and stop reading once the JSON is complete
+        self.stream_responses = os.getenv('STREAM_RESPONSES', 'false').lower() == 'true'
+        
+        # Agent result caching (exact + semantic match)
+        self.enable_cache = os.getenv('ENABLE_CACHE', 'false').lower() == 'true'
+        self.cache_ttl = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
+        # Directory for the persistent summary cache (used when caching is enabled)
+        self.summary_cache_dir = os.getenv('SUMMARY_CACHE_DIR', '.cache')
+        
+        # Constrain agent responses with a JSON schema (structured outputs).
+        # Disable for providers that don't support response_format.
+        self.structured_output = os.getenv('STRUCTURED_OUTPUT', 'false').lower() == 'true'
+        
+        # Also drop paraphrased action items across chunks using embeddings
+        self.semantic_dedup = os.getenv('SEMANTIC_DEDUP', 'false').lower() == 'true'
+        
+        # Skip the Risk Agent for documents shorter than this many words unless
+        # they contain a question mark or one of the keywords (0 always runs it)
+        self.risk_min_words = int(os.getenv('RISK_MIN_WORDS', '100'))
+        self.risk_keywords = tuple(
+            keyword.strip().lower()
+            for keyword in os.getenv('RISK_KEYWORDS', 'risk,issue,concern,tbd,assume').split(',')
+            if keyword.strip()
+        )
+        
+        # Fraction of sentences kept when compressing chunks for the Action and
+        # Risk agents (1.0 disables compression; Summary always sees full text)
+        self.compress_ratio = float(os.getenv('COMPRESS_RATIO', '1.0'))
+        
         # Azure OpenAI (optional)
         self.azure_endpoint = os.getenv('AZURE_OPENAI_ENDPOINT', '')
         self.azure_api_key = os.getenv('AZURE_OPENAI_API_KEY', '')
@@ -44,10 +90,30 @@ class Config:
         self.local_model_base_url = os.getenv('LOCAL_MODEL_BASE_URL', 'http://localhost:11434')
         self.local_model_name = os.getenv('LOCAL_MODEL_NAME', 'llama2')
         
+        # Context budget for packing several chunks into one Summary Agent call
+        # (0 sends one call per chunk)
+        self.summary_pack_tokens = int(os.getenv('SUMMARY_PACK_TOKENS', '8000'))
+        
+        # Summarize long documents from a one-line fingerprint plus brief per-chunk
+        # summaries/decisions/constraints instead of full per-chunk summaries and a synthesis call
+        self.summary_fingerprint = os.getenv('SUMMARY_FINGERPRINT', 'false').lower() == 'true'
+        
+        # Answer single-chunk documents with one combined Summary/Action/Risk
+        # request (falls back to the individual agents if the answer is truncated)
+        self.fused_mode = os.getenv('FUSED_MODE', 'false').lower() == 'true'
+        
         # Document processing settings
         self.chunk_size = 1000  # tokens per chunk
         self.chunk_overlap = 100  # reduced overlap for smaller chunks
         
+        self._frozen = True
+    
+    def __setattr__(self, name: str, value: Any):
+        """Reject changes once the environment has been read"""
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"Config is read-only (cannot set '{name}')")
+        super().__setattr__(name, value)
+        
     def validate(self) -> bool:
         """Validate that required configuration is present"""
         if self.use_openrouter:
@@ -108,18 +174,40 @@ class Config:
         """Get agent-specific configuration"""
         base_config = self.get_llm_config()
         
-        # Customize temperature for different agents
+        # Customize temperature for different agents. Summary and action
+        # extraction are deterministic tasks: temperature 0 makes identical
+        # inputs give (near-)identical outputs, so cached results are as good
+        # as fresh ones and retries don't drift. Risk analysis keeps a little
+        # variety to surface less obvious concerns.
         agent_temps = {
-            "summary": 0.5,  # More focused for summaries
-            "action": 0.3,   # Very precise for action extraction
-            "risk": 0.7,     # More creative for risk identification
+            "summary": 0.0,
+            "action": 0.0,
+            "risk": 0.2,
         }
         
         if agent_name.lower() in agent_temps:
             base_config["temperature"] = agent_temps[agent_name.lower()]
         
+        base_config["max_concurrency"] = self.max_concurrency
+        base_config["rate_limit_rpm"] = self.rate_limit_rpm
+        base_config["rate_limit_tpm"] = self.rate_limit_tpm
+        base_config["stream"] = self.stream_responses
+        base_config["enable_cache"] = self.enable_cache
+        base_config["cache_ttl"] = self.cache_ttl
+        base_config["summary_cache_dir"] = self.summary_cache_dir
+        base_config["summary_pack_tokens"] = self.summary_pack_tokens
+        base_config["summary_fingerprint"] = self.summary_fingerprint
+        base_config["structured_output"] = self.structured_output
+        base_config["semantic_dedup"] = self.semantic_dedup
+        
         return base_config
 
 
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """Get the process-wide configuration, reading the environment on first use"""
+    return Config()
+
+
 # Global config instance
-config = Config()
+config = get_config()
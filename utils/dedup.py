@@ -0,0 +1,86 @@
+"""
+Near-duplicate detection helpers based on word-set similarity and embeddings
+"""
+import re
+from typing import FrozenSet, Iterable, List, Sequence
+import numpy as np
+
+_NON_WORD_RE = re.compile(r"[^\w\s]+")
+_WS_RE = re.compile(r"\s+")
+
+# Words that change the wording of a task or risk title but not its meaning
+_IGNORED_WORDS = frozenset({"a", "an", "the"})
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and strip punctuation/extra whitespace for comparison"""
+    text = _NON_WORD_RE.sub(" ", text.lower())
+    return _WS_RE.sub(" ", text).strip()
+
+
+def word_shingles(text: str) -> FrozenSet[str]:
+    """Set of normalized words in a text, ignoring articles"""
+    return frozenset(normalize_text(text).split()) - _IGNORED_WORDS
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two word sets (two empty sets are identical)"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def is_near_duplicate(
+    shingle_set: FrozenSet[str],
+    seen: Iterable[FrozenSet[str]],
+    threshold: float = 0.8
+) -> bool:
+    """
+    Check whether a word set is at least threshold-similar to any seen set
+
+    Task and risk titles are a handful of words, so whole-word overlap is
+    used rather than character n-grams: at 0.8, an added article or one
+    extra word in a 4+ word title still matches, while one changed word in a
+    short title ("Send report to Bob" / "Send report to Alice") does not.
+    """
+    return any(jaccard(shingle_set, other) >= threshold for other in seen)
+
+
+def ordered_dedup(items: Iterable[str]) -> List[str]:
+    """Remove duplicates (ignoring case, punctuation and spacing) while keeping first-seen order"""
+    seen = {}
+    for item in items:
+        key = normalize_text(str(item))
+        if key and key not in seen:
+            seen[key] = item
+    return list(seen.values())
+
+
+def semantic_dedup_indices(embeddings: Sequence[Sequence[float]], threshold: float = 0.9) -> List[int]:
+    """
+    Indices of items to keep after dropping embedding near-duplicates
+
+    All pairwise cosine similarities are computed with a single matrix
+    product; an item is dropped when it is at least threshold-similar to an
+    earlier item that was kept.
+
+    Args:
+        embeddings: One embedding vector per item, in item order
+        threshold: Cosine similarity at or above which items are duplicates
+
+    Returns:
+        Indices of the kept items, in ascending order
+    """
+    if len(embeddings) <= 1:
+        return list(range(len(embeddings)))
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms == 0, 1.0, norms)
+    similarity = matrix @ matrix.T
+
+    keep = np.ones(len(matrix), dtype=bool)
+    for i in range(len(matrix)):
+        if keep[i]:
+            keep[i + 1:] &= similarity[i, i + 1:] < threshold
+    return np.flatnonzero(keep).tolist()
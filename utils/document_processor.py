@@ -1,12 +1,77 @@
 """
 Document processing utilities for chunking and preprocessing
+
+The tokenizer and the PDF/DOCX readers are imported on first use so that
+importing this module (and starting the app) stays cheap.
 """
-import tiktoken
-from typing import List, Dict, Any, Union
-import re
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple
+import copy
+import hashlib
 import io
-import PyPDF2
-import docx
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str):
+    """Load a tiktoken encoding once per process"""
+    import tiktoken
+    return tiktoken.get_encoding(name)
+
+
+def _chunk_spans(counts: List[int], chunk_size: int, chunk_overlap: int) -> List[Tuple[int, int, int]]:
+    """
+    Plan overlapping chunk boundaries from per-sentence token counts
+    
+    This is the chunking hot loop reduced to integer arithmetic on a list,
+    with no DocumentProcessor state, so it compiles with mypyc unchanged.
+    
+    Returns:
+        (first sentence index, end sentence index, tokens) for each chunk
+    """
+    spans: List[Tuple[int, int, int]] = []
+    num_sentences = len(counts)
+    start = 0
+    current_tokens = 0
+    
+    for i in range(num_sentences):
+        sentence_tokens = counts[i]
+        
+        # If adding this sentence exceeds chunk size, close the current chunk
+        if current_tokens + sentence_tokens > chunk_size and start < i:
+            spans.append((start, i, current_tokens))
+            
+            # Create overlap by keeping the last few sentences: walk the
+            # counts back from the end of the chunk, summing until the
+            # overlap is reached. At least one sentence is dropped so the
+            # chunks advance, and the kept sentences plus the next one
+            # must still fit in a chunk.
+            overlap_tokens = 0
+            cut = i
+            while (
+                cut > start + 1
+                and overlap_tokens < chunk_overlap
+                and overlap_tokens + counts[cut - 1] + sentence_tokens <= chunk_size
+            ):
+                cut -= 1
+                overlap_tokens += counts[cut]
+            
+            start = cut
+            current_tokens = overlap_tokens
+        
+        current_tokens += sentence_tokens
+    
+    # Add the last chunk
+    if start < num_sentences:
+        spans.append((start, num_sentences, current_tokens))
+    
+    return spans
 
 
 class DocumentProcessor:
@@ -22,75 +87,171 @@ class DocumentProcessor:
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        self.encoding = tiktoken.get_encoding("cl100k_base")  # GPT-4 encoding
+        self._processed_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._processed_lock = threading.Lock()
+    
+    @property
+    def encoding(self):
+        """Tokenizer shared by all processors, loaded on first use"""
+        return get_encoding("cl100k_base")  # GPT-4 encoding
     
     def count_tokens(self, text: str) -> int:
-        """Count the number of tokens in a text"""
-        return len(self.encoding.encode(text))
+        """Count the number of tokens in a text (special-token markers count as plain text)"""
+        return len(self.encoding.encode_ordinary(text))
+    
+    # Below this many pages a thread pool costs more than it saves
+    PARALLEL_PDF_MIN_PAGES = 5
+    
+    # Processed documents kept in memory (least recently used evicted first)
+    PROCESSED_CACHE_SIZE = 8
     
     def read_pdf(self, file_obj) -> str:
-        """Extract text from PDF file object"""
+        """Extract text from PDF file object (via PDFium when installed, else PyPDF2)"""
         try:
-            pdf_reader = PyPDF2.PdfReader(file_obj)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            data = file_obj.read()
+            try:
+                parts = self._pdf_pages_pdfium(data)
+            except ImportError:
+                parts = self._pdf_pages_pypdf2(data)
+            except Exception as e:
+                # PDFium rejects some encrypted or malformed files PyPDF2 can read
+                logger.warning("PDFium could not read the PDF, falling back to PyPDF2: %s", e)
+                parts = self._pdf_pages_pypdf2(data)
+            return "".join([part + "\n" for part in parts])
         except Exception as e:
             return f"Error reading PDF: {str(e)}"
+    
+    def _pdf_pages_pdfium(self, data: bytes) -> List[str]:
+        """Per-page text extracted natively by PDFium, without layout reconstruction"""
+        import pypdfium2 as pdfium
+        
+        # PDFium is not thread-safe, and is fast enough that pages are read serially
+        pdf = pdfium.PdfDocument(data)
+        try:
+            parts = []
+            for page_number in range(len(pdf)):
+                page = pdf[page_number]
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return parts
+        finally:
+            pdf.close()
+    
+    def _pdf_pages_pypdf2(self, data: bytes) -> List[str]:
+        """Per-page text from PyPDF2 (pages are extracted in parallel for longer files)"""
+        import PyPDF2
+        
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+        num_pages = len(pdf_reader.pages)
+        if num_pages < self.PARALLEL_PDF_MIN_PAGES:
+            return [page.extract_text() or "" for page in pdf_reader.pages]
+        
+        # A reader seeks its shared stream while resolving objects, so each
+        # worker thread parses the bytes with a reader of its own
+        local = threading.local()
+        
+        def _extract(page_number: int) -> str:
+            if not hasattr(local, "reader"):
+                local.reader = PyPDF2.PdfReader(io.BytesIO(data))
+            return local.reader.pages[page_number].extract_text() or ""
+        
+        with ThreadPoolExecutor(max_workers=min(8, num_pages)) as executor:
+            return list(executor.map(_extract, range(num_pages)))
 
     def read_docx(self, file_obj) -> str:
         """Extract text from DOCX file object"""
         try:
+            import docx
             doc = docx.Document(file_obj)
-            text = ""
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-            return text
+            return "".join([para.text + "\n" for para in doc.paragraphs])
         except Exception as e:
             return f"Error reading DOCX: {str(e)}"
     
     def clean_text(self, text: str) -> str:
         """Clean and normalize text"""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        # Remove special characters that might cause issues
-        text = text.strip()
-        return text
+        # Collapse whitespace runs and trim the ends (str.split runs in C, no regex)
+        return ' '.join(text.split())
     
-    def extract_metadata(self, text: str) -> Dict[str, Any]:
-        """Extract basic metadata from document"""
-        lines = text.split('\n')
-        words = text.split()
+    def extract_metadata(
+        self,
+        text: str,
+        total_tokens: int = None,
+        already_cleaned: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Extract basic metadata from document
+        
+        Args:
+            text: Document text
+            total_tokens: Token count of the text, if already known
+            already_cleaned: The text came from clean_text, so words are
+                separated by exactly one space and can be counted without
+                building a word list
+        """
+        if already_cleaned:
+            total_words = text.count(' ') + 1 if text else 0
+        else:
+            total_words = len(text.split())
         
         return {
             "total_characters": len(text),
-            "total_words": len(words),
-            "total_lines": len(lines),
-            "total_tokens": self.count_tokens(text),
+            "total_words": total_words,
+            "total_lines": text.count('\n') + 1,
+            "total_tokens": total_tokens if total_tokens is not None else self.count_tokens(text),
         }
     
     def chunk_by_sentences(self, text: str) -> List[str]:
-        """Split text into sentences"""
-        # Simple sentence splitter
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        """Split text into sentences at whitespace that follows '.', '!' or '?'"""
+        # Single forward scan: str.find locates each terminator in C, and only
+        # the terminator just consumed is searched for again
+        sentences = []
+        length = len(text)
+        start = 0
+        next_pos = {mark: text.find(mark) for mark in '.!?'}
+        while True:
+            pos = min((p for p in next_pos.values() if p != -1), default=-1)
+            if pos == -1:
+                break
+            for mark, p in next_pos.items():
+                if p == pos:
+                    next_pos[mark] = text.find(mark, pos + 1)
+            
+            end = pos + 1
+            if end < length and text[end].isspace():
+                sentences.append(text[start:end])
+                while end < length and text[end].isspace():
+                    end += 1
+                start = end
+        sentences.append(text[start:])
         return [s.strip() for s in sentences if s.strip()]
     
-    def create_chunks(self, text: str) -> List[Dict[str, Any]]:
+    def create_chunks(
+        self,
+        text: str,
+        already_cleaned: bool = False,
+        total_tokens: int = None
+    ) -> List[Dict[str, Any]]:
         """
         Split document into overlapping chunks
         
         Args:
             text: Input document text
+            already_cleaned: Skip clean_text when the caller has already run it
+            total_tokens: Token count of the cleaned text, if already known
             
         Returns:
             List of chunks with metadata
         """
         # Clean the text first
-        text = self.clean_text(text)
+        if not already_cleaned:
+            text = self.clean_text(text)
+            total_tokens = None
         
         # Check if chunking is needed
-        total_tokens = self.count_tokens(text)
+        if total_tokens is None:
+            total_tokens = self.count_tokens(text)
         if total_tokens <= self.chunk_size:
             return [{
                 "chunk_id": 0,
@@ -102,55 +263,24 @@ class DocumentProcessor:
         # Split into sentences for better chunk boundaries
         sentences = self.chunk_by_sentences(text)
         
-        chunks = []
-        current_chunk = []
-        current_tokens = 0
-        chunk_id = 0
-        
-        for sentence in sentences:
-            sentence_tokens = self.count_tokens(sentence)
-            
-            # If adding this sentence exceeds chunk size, save current chunk
-            if current_tokens + sentence_tokens > self.chunk_size and current_chunk:
-                chunk_text = ' '.join(current_chunk)
-                chunks.append({
-                    "chunk_id": chunk_id,
-                    "text": chunk_text,
-                    "tokens": current_tokens,
-                    "is_complete_document": False
-                })
-                
-                # Create overlap by keeping last few sentences
-                overlap_text = chunk_text
-                overlap_tokens = current_tokens
-                overlap_sentences = []
-                
-                # Build overlap from end of current chunk
-                for s in reversed(current_chunk):
-                    s_tokens = self.count_tokens(s)
-                    if overlap_tokens - s_tokens >= self.chunk_overlap:
-                        break
-                    overlap_sentences.insert(0, s)
-                    overlap_tokens -= s_tokens
-                
-                # Start new chunk with overlap
-                current_chunk = overlap_sentences
-                current_tokens = self.count_tokens(' '.join(current_chunk))
-                chunk_id += 1
-            
-            current_chunk.append(sentence)
-            current_tokens += sentence_tokens
+        # All sentences are tokenized in one batch call; chunk and overlap
+        # sizes are running sums of the per-sentence counts
+        sentence_tokens_list = [
+            len(ids) for ids in self.encoding.encode_ordinary_batch(sentences, num_threads=os.cpu_count() or 1)
+        ]
         
-        # Add the last chunk
-        if current_chunk:
-            chunks.append({
+        # Boundaries are planned on the integer counts alone; each chunk's
+        # text is then joined once from its sentence range
+        spans = _chunk_spans(sentence_tokens_list, self.chunk_size, self.chunk_overlap)
+        return [
+            {
                 "chunk_id": chunk_id,
-                "text": ' '.join(current_chunk),
-                "tokens": current_tokens,
+                "text": ' '.join(sentences[start:end]),
+                "tokens": tokens,
                 "is_complete_document": False
-            })
-        
-        return chunks
+            }
+            for chunk_id, (start, end, tokens) in enumerate(spans)
+        ]
     
     def process_document(self, text: str) -> Dict[str, Any]:
         """
@@ -162,9 +292,34 @@ class DocumentProcessor:
         Returns:
             Dictionary with metadata and chunks
         """
+        # Re-running the same document (a retry, or pressing Process again)
+        # reuses the cleaned text, token count and chunks
+        key = (
+            self.chunk_size,
+            self.chunk_overlap,
+            hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        )
+        with self._processed_lock:
+            cached = self._processed_cache.get(key)
+            if cached is not None:
+                self._processed_cache.move_to_end(key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        result = self._process_document(text)
+        
+        with self._processed_lock:
+            self._processed_cache[key] = copy.deepcopy(result)
+            while len(self._processed_cache) > self.PROCESSED_CACHE_SIZE:
+                self._processed_cache.popitem(last=False)
+        return result
+    
+    def _process_document(self, text: str) -> Dict[str, Any]:
+        """Uncached body of process_document"""
         cleaned_text = self.clean_text(text)
-        metadata = self.extract_metadata(cleaned_text)
-        chunks = self.create_chunks(cleaned_text)
+        total_tokens = self.count_tokens(cleaned_text)
+        metadata = self.extract_metadata(cleaned_text, total_tokens, already_cleaned=True)
+        chunks = self.create_chunks(cleaned_text, already_cleaned=True, total_tokens=total_tokens)
         
         return {
             "original_text": text,
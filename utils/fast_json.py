@@ -0,0 +1,51 @@
+"""
+JSON helpers backed by orjson when available, with a stdlib fallback
+"""
+import json
+from typing import Any, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so this covers both
+JSONDecodeError = json.JSONDecodeError
+
+_decoder = json.JSONDecoder()
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a JSON document"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize an object to a JSON string (UTF-8, optionally indented by 2)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+
+def dumpb(obj: Any, indent: bool = False) -> bytes:
+    """Serialize an object to UTF-8 JSON bytes (compact, or indented by 2)"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_prefix(text: str, start: int = 0) -> Tuple[Any, int]:
+    """
+    Parse the JSON value that begins at text[start], ignoring whatever follows
+
+    Parsing is a single forward pass that stops at the end of the value, so
+    the tail of the text is never scanned or copied.
+
+    Returns:
+        Tuple of (parsed value, index just past the value)
+    """
+    return _decoder.raw_decode(text, start)
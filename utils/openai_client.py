@@ -0,0 +1,44 @@
+"""
+Shared OpenAI clients so agents reuse connection pools
+"""
+import asyncio
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+from openai import OpenAI, AsyncOpenAI
+
+
+# Async clients hold connections bound to the event loop that opened them,
+# so they are cached per running loop rather than process-wide.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, Optional[str]], AsyncOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _client_kwargs(api_key: str, base_url: Optional[str]) -> Dict[str, Any]:
+    """Build client constructor arguments with optional base_url for OpenRouter"""
+    # utils.retry owns the retry policy (backoff, Retry-After, rate-limit
+    # pauses); SDK retries underneath it would multiply the attempts
+    client_kwargs = {"api_key": api_key, "max_retries": 0}
+    if base_url:
+        client_kwargs["base_url"] = base_url
+    return client_kwargs
+
+
+@lru_cache(maxsize=8)
+def get_client(api_key: str, base_url: Optional[str] = None) -> OpenAI:
+    """Get the shared sync client for an API key and base URL"""
+    return OpenAI(**_client_kwargs(api_key, base_url))
+
+
+def get_async_client(api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Get the shared async client for an API key and base URL
+
+    Must be called from a running event loop.
+    """
+    clients = _async_clients.setdefault(asyncio.get_running_loop(), {})
+    key = (api_key, base_url)
+    if key not in clients:
+        clients[key] = AsyncOpenAI(**_client_kwargs(api_key, base_url))
+    return clients[key]
@@ -1,15 +1,27 @@
 """
 Output formatting utilities for structured results
 """
-import json
+import io
 import pandas as pd
 from typing import Dict, Any, List
 from datetime import datetime
 
+from utils import fast_json
+
+_SEVERITY_EMOJI = {"HIGH": "🔴", "MEDIUM": "🟡", "LOW": "🟢"}
+
+
+def _safe_len(data: Dict[str, Any], key: str) -> int:
+    """Length of data[key], treating a missing or null field as empty"""
+    value = data.get(key)
+    return len(value) if value else 0
+
 
 class OutputFormatter:
     """Formats agent outputs into structured JSON and display tables"""
     
+    ACTION_COLUMNS = ["Task", "Owner", "Deadline", "Dependencies"]
+    
     @staticmethod
     def validate_summary(summary_data: Dict[str, Any]) -> bool:
         """Validate summary output structure"""
@@ -46,33 +58,63 @@ class OutputFormatter:
         
         if "key_decisions" in summary_data and summary_data["key_decisions"]:
             output.append("\n### Key Decisions\n")
-            for i, decision in enumerate(summary_data["key_decisions"], 1):
-                output.append(f"{i}. {decision}")
+            output.extend([f"{i}. {decision}" for i, decision in enumerate(summary_data["key_decisions"], 1)])
             output.append("\n")
         
         if "constraints" in summary_data and summary_data["constraints"]:
             output.append("\n### Critical Constraints\n")
-            for i, constraint in enumerate(summary_data["constraints"], 1):
-                output.append(f"{i}. {constraint}")
+            output.extend([f"{i}. {constraint}" for i, constraint in enumerate(summary_data["constraints"], 1)])
         
         return "\n".join(output)
     
+    @staticmethod
+    def _action_columns(actions_data: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+        """Action items as one list per display column"""
+        return {
+            "Task": [action.get("task", "N/A") for action in actions_data],
+            "Owner": [action.get("owner", "Not specified") for action in actions_data],
+            "Deadline": [action.get("deadline", "Not specified") for action in actions_data],
+            "Dependencies": [
+                ", ".join(action["dependencies"]) if action.get("dependencies") else "None"
+                for action in actions_data
+            ]
+        }
+    
     @staticmethod
     def format_actions_as_dataframe(actions_data: List[Dict[str, Any]]) -> pd.DataFrame:
         """Convert action items to pandas DataFrame for table display"""
         if not actions_data:
-            return pd.DataFrame(columns=["Task", "Owner", "Deadline", "Dependencies"])
-        
-        formatted_actions = []
-        for action in actions_data:
-            formatted_actions.append({
-                "Task": action.get("task", "N/A"),
-                "Owner": action.get("owner", "Not specified"),
-                "Deadline": action.get("deadline", "Not specified"),
-                "Dependencies": ", ".join(action.get("dependencies", [])) if action.get("dependencies") else "None"
-            })
-        
-        return pd.DataFrame(formatted_actions)
+            return pd.DataFrame(columns=OutputFormatter.ACTION_COLUMNS)
+        
+        # Column lists (one per field) let pandas build each column directly
+        # instead of inferring a schema from per-row dicts
+        return pd.DataFrame(
+            OutputFormatter._action_columns(actions_data),
+            columns=OutputFormatter.ACTION_COLUMNS
+        )
+    
+    @staticmethod
+    def _actions_csv_arrow(actions_data: List[Dict[str, Any]]) -> bytes:
+        """
+        Write action items as CSV with Arrow's native writer
+        
+        Arrow quotes every string value, so the bytes differ from pandas'
+        minimally quoted output, but both parse to the same rows.
+        
+        Raises ImportError without pyarrow, and TypeError/ValueError when a
+        field is not a string (e.g. a numeric deadline).
+        """
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        
+        schema = pa.schema([(name, pa.string()) for name in OutputFormatter.ACTION_COLUMNS])
+        table = pa.table(OutputFormatter._action_columns(actions_data), schema=schema)
+        
+        # The fixed column names need no quoting, so the header is written plainly
+        sink = io.BytesIO()
+        sink.write((",".join(OutputFormatter.ACTION_COLUMNS) + "\n").encode("utf-8"))
+        pa_csv.write_csv(table, sink, write_options=pa_csv.WriteOptions(include_header=False))
+        return sink.getvalue()
     
     @staticmethod
     def format_risks_for_display(risks_data: Dict[str, Any]) -> str:
@@ -81,21 +123,19 @@ class OutputFormatter:
         
         if "open_questions" in risks_data and risks_data["open_questions"]:
             output.append("### 🤔 Open Questions\n")
-            for i, question in enumerate(risks_data["open_questions"], 1):
-                output.append(f"{i}. {question}")
+            output.extend([f"{i}. {question}" for i, question in enumerate(risks_data["open_questions"], 1)])
             output.append("\n")
         
         if "assumptions" in risks_data and risks_data["assumptions"]:
             output.append("\n### 📋 Assumptions\n")
-            for i, assumption in enumerate(risks_data["assumptions"], 1):
-                output.append(f"{i}. {assumption}")
+            output.extend([f"{i}. {assumption}" for i, assumption in enumerate(risks_data["assumptions"], 1)])
             output.append("\n")
         
         if "risks" in risks_data and risks_data["risks"]:
             output.append("\n### ⚠️ Identified Risks\n")
             for risk in risks_data["risks"]:
                 severity = risk.get("severity", "medium").upper()
-                severity_emoji = {"HIGH": "🔴", "MEDIUM": "🟡", "LOW": "🟢"}.get(severity, "🟡")
+                severity_emoji = _SEVERITY_EMOJI.get(severity, "🟡")
                 output.append(f"\n**{severity_emoji} {risk.get('title', 'Untitled Risk')}** ({severity})")
                 output.append(f"\n{risk.get('description', 'No description')}")
         
@@ -123,25 +163,32 @@ class OutputFormatter:
     
     @staticmethod
     def export_to_json(data: Dict[str, Any], filepath: str = None) -> str:
-        """Export results to JSON format"""
-        json_str = json.dumps(data, indent=2, ensure_ascii=False)
+        """Export results to JSON format (serialized by orjson when installed)"""
+        json_bytes = fast_json.dumpb(data, indent=True)
         
         if filepath:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(json_str)
+            with open(filepath, 'wb') as f:
+                f.write(json_bytes)
         
-        return json_str
+        return json_bytes.decode('utf-8')
     
     @staticmethod
     def export_actions_to_csv(actions_data: List[Dict[str, Any]], filepath: str = None) -> str:
-        """Export action items to CSV format"""
-        df = OutputFormatter.format_actions_as_dataframe(actions_data)
+        """Export action items to CSV format (written by pyarrow when installed)"""
+        try:
+            csv_bytes = OutputFormatter._actions_csv_arrow(actions_data)
+        except (ImportError, TypeError, ValueError):
+            df = OutputFormatter.format_actions_as_dataframe(actions_data)
+            if filepath:
+                df.to_csv(filepath, index=False)
+                return filepath
+            return df.to_csv(index=False)
         
         if filepath:
-            df.to_csv(filepath, index=False)
+            with open(filepath, 'wb') as f:
+                f.write(csv_bytes)
             return filepath
-        else:
-            return df.to_csv(index=False)
+        return csv_bytes.decode('utf-8')
     
     @staticmethod
     def create_summary_stats(
@@ -151,9 +198,9 @@ class OutputFormatter:
     ) -> Dict[str, int]:
         """Create summary statistics for display"""
         return {
-            "total_actions": len(actions_data),
-            "total_risks": len(risks_data.get("risks", [])),
-            "total_open_questions": len(risks_data.get("open_questions", [])),
-            "total_assumptions": len(risks_data.get("assumptions", [])),
-            "key_decisions": len(summary_data.get("key_decisions", [])),
+            "total_actions": len(actions_data) if actions_data else 0,
+            "total_risks": _safe_len(risks_data, "risks"),
+            "total_open_questions": _safe_len(risks_data, "open_questions"),
+            "total_assumptions": _safe_len(risks_data, "assumptions"),
+            "key_decisions": _safe_len(summary_data, "key_decisions"),
         }
@@ -0,0 +1,59 @@
+"""
+Helpers for provider-side prompt caching of static system messages
+"""
+from typing import Any, Dict
+
+# OpenAI only caches prompts whose identical prefix is at least this long
+AUTOMATIC_CACHE_MIN_TOKENS = 1024
+
+
+def supports_cache_control(model: str) -> bool:
+    """Check whether the model accepts explicit cache_control breakpoints (Anthropic)"""
+    return model.startswith(("anthropic/", "claude"))
+
+
+def uses_automatic_caching(model: str) -> bool:
+    """Check whether the model is an OpenAI model with automatic prefix caching"""
+    return model.startswith(("openai/", "gpt-", "o1", "o3", "o4"))
+
+
+def build_system_message(content: str, model: str) -> Dict[str, Any]:
+    """
+    Build the system message, marking it cacheable where the provider supports it
+
+    The system message must stay first and byte-identical across calls for the
+    provider to reuse the cached prefix.
+
+    Args:
+        content: Static system prompt text
+        model: Model the request is sent to
+
+    Returns:
+        Chat message dictionary for the system role
+    """
+    if supports_cache_control(model):
+        return {
+            "role": "system",
+            "content": [{
+                "type": "text",
+                "text": content,
+                "cache_control": {"type": "ephemeral"}
+            }]
+        }
+    return {"role": "system", "content": content}
+
+
+def cached_prompt_tokens(usage: Any) -> int:
+    """
+    Number of prompt tokens served from the provider's cache
+
+    Anthropic reports cache_read_input_tokens; OpenAI reports
+    prompt_tokens_details.cached_tokens.
+    """
+    if usage is None:
+        return 0
+    cached = getattr(usage, "cache_read_input_tokens", None)
+    if cached is None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) if details is not None else None
+    return cached or 0
@@ -0,0 +1,176 @@
+"""
+Client-side rate limiting shared by all agents calling the same model
+"""
+import asyncio
+import contextlib
+import threading
+import time
+from functools import lru_cache
+from typing import Any, AsyncIterator, Mapping, Optional
+from openai import RateLimitError
+from utils.retry import acall_with_retry, retry_after
+
+
+class TokenBucket:
+    """
+    Request and token budgets that refill continuously up to a per-minute limit
+
+    Callers wait until both budgets can cover the request instead of sending
+    it and retrying on 429s. The provider's x-ratelimit-remaining-* headers
+    and Retry-After on 429s pull the budgets down to what the server reports,
+    which also accounts for other clients sharing the key. No loop-bound
+    primitives are held, so one bucket can be shared across event loops (each
+    Streamlit run uses asyncio.run); a thread lock makes the budget check and
+    its consumption atomic across those runs' threads.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        """
+        Initialize the bucket
+
+        Args:
+            rpm: Requests per minute (0 for no request limit)
+            tpm: Tokens per minute (0 for no token limit)
+        """
+        self.rpm = rpm
+        self.tpm = tpm
+        self._available_requests = float(rpm)
+        self._available_tokens = float(tpm)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        """Add the budget accrued since the last refill, capped at one minute's worth"""
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.rpm:
+            self._available_requests = min(self.rpm, self._available_requests + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._available_tokens = min(self.tpm, self._available_tokens + elapsed * self.tpm / 60.0)
+
+    def _wait_time(self, tokens: float) -> float:
+        """Seconds until both budgets can cover a request of the given size"""
+        wait = max(0.0, self._paused_until - time.monotonic())
+        if self.rpm and self._available_requests < 1:
+            wait = max(wait, (1 - self._available_requests) * 60.0 / self.rpm)
+        if self.tpm and self._available_tokens < tokens:
+            wait = max(wait, (tokens - self._available_tokens) * 60.0 / self.tpm)
+        return wait
+
+    async def wait(self, estimated_tokens: int = 0):
+        """
+        Wait until a request fits in the budget, then consume it
+
+        Args:
+            estimated_tokens: Approximate tokens the request will use
+        """
+        # A request larger than the whole budget would otherwise wait forever
+        tokens = min(estimated_tokens, self.tpm) if self.tpm else 0
+        while True:
+            with self._lock:
+                self._refill()
+                delay = self._wait_time(tokens)
+                if delay <= 0:
+                    if self.rpm:
+                        self._available_requests -= 1
+                    if self.tpm:
+                        self._available_tokens -= tokens
+                    return
+            await asyncio.sleep(delay)
+
+    def observe(self, headers: Mapping[str, str]):
+        """
+        Lower the budgets to the remaining quota reported in response headers
+
+        Reads x-ratelimit-remaining-requests / x-ratelimit-remaining-tokens
+        (OpenAI) or x-ratelimit-remaining (OpenRouter); missing or malformed
+        headers are ignored.
+        """
+        remaining_requests = _header_number(
+            headers, "x-ratelimit-remaining-requests", "x-ratelimit-remaining"
+        )
+        remaining_tokens = _header_number(headers, "x-ratelimit-remaining-tokens")
+        with self._lock:
+            self._refill()
+            if self.rpm and remaining_requests is not None:
+                self._available_requests = min(self._available_requests, remaining_requests)
+            if self.tpm and remaining_tokens is not None:
+                self._available_tokens = min(self._available_tokens, remaining_tokens)
+
+    def pause(self, seconds: float):
+        """Hold every request on this bucket for the given time (e.g. after a 429)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """Async context manager form of wait"""
+        await self.wait(estimated_tokens)
+        yield
+
+
+@lru_cache(maxsize=32)
+def get_rate_limiter(api_key: str, model: str, rpm: int = 0, tpm: int = 0) -> Optional[TokenBucket]:
+    """
+    Get the bucket shared by all agents using an API key and model
+
+    Returns:
+        The shared TokenBucket, or None when no limits are configured
+    """
+    if not rpm and not tpm:
+        return None
+    return TokenBucket(rpm, tpm)
+
+
+def _header_number(headers: Mapping[str, str], *names: str) -> Optional[float]:
+    """First of the named headers that parses as a number"""
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return float(value)
+        except ValueError:
+            continue
+    return None
+
+
+async def acreate_limited(
+    completions: Any,
+    limiter: Optional[TokenBucket],
+    estimated_tokens: int = 0,
+    **request
+) -> Any:
+    """
+    Create a chat completion under the limiter, retrying transient failures
+
+    With a limiter, the raw response is requested so its rate-limit headers
+    can be fed back into the bucket, and a 429's Retry-After pauses every
+    caller sharing the bucket rather than only the one that was rejected.
+
+    Args:
+        completions: The client's chat.completions resource
+        limiter: Shared bucket, or None for no client-side limiting
+        estimated_tokens: Approximate tokens the request will use
+        **request: Arguments for completions.create
+
+    Returns:
+        The parsed chat completion (or stream)
+    """
+    if limiter is None:
+        return await acall_with_retry(completions.create, **request)
+
+    async def _create(**kwargs) -> Any:
+        try:
+            return await completions.with_raw_response.create(**kwargs)
+        except RateLimitError as e:
+            limiter.pause(retry_after(e) or 1.0)
+            raise
+
+    async with limiter.acquire(estimated_tokens):
+        raw = await acall_with_retry(_create, **request)
+    limiter.observe(raw.headers)
+    return raw.parse()
+
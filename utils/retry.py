@@ -0,0 +1,88 @@
+"""
+Retry helpers for transient LLM API failures
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+from openai import APIConnectionError, APITimeoutError, RateLimitError
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether an API error is transient (429, 5xx or connection issues)"""
+    if isinstance(error, (RateLimitError, APIConnectionError, APITimeoutError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return status_code is not None and status_code >= 500
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait (Retry-After / retry-after-ms), if any"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date values fall back to exponential backoff
+        pass
+    return None
+
+
+def backoff_delay(error: Exception, attempt: int, base_delay: float) -> float:
+    """Delay before the next attempt: the server's Retry-After, else jittered exponential backoff"""
+    delay = retry_after(error)
+    if delay is not None:
+        return delay
+    return base_delay * 2 ** attempt + random.uniform(0, base_delay)
+
+
+def call_with_retry(
+    func: Callable[..., Any],
+    *args,
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    **kwargs
+) -> Any:
+    """Blocking counterpart of acall_with_retry"""
+    for attempt in range(max_retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            time.sleep(backoff_delay(e, attempt, base_delay))
+
+
+async def acall_with_retry(
+    func: Callable[..., Awaitable[Any]],
+    *args,
+    max_retries: int = 3,
+    base_delay: float = 1.0,
+    **kwargs
+) -> Any:
+    """
+    Await an API call, retrying transient failures with exponential backoff
+
+    A Retry-After header on the error takes precedence over the backoff schedule.
+
+    Args:
+        func: Async callable to invoke (e.g. client.chat.completions.create)
+        max_retries: Maximum number of retries after the first attempt
+        base_delay: Delay in seconds before the first retry, doubled each attempt
+            (plus up to base_delay of random jitter)
+
+    Returns:
+        The result of the call
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_retries or not is_retryable(e):
+                raise
+            await asyncio.sleep(backoff_delay(e, attempt, base_delay))
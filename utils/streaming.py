@@ -0,0 +1,265 @@
+"""
+Helpers for incrementally parsing streamed LLM responses
+"""
+from typing import Any, List, Optional
+from utils import fast_json
+
+# Characters that can sit between the items of an array of objects
+_ARRAY_LEVEL_CHARS = frozenset("{[], \t\r\n")
+
+
+def _next_json_start(text: str, pos: int, openers: str = "{[") -> int:
+    """Index of the next opening character (by default '{' or '[') at or after pos, or -1"""
+    starts = [i for i in (text.find(ch, pos) for ch in openers) if i != -1]
+    return min(starts) if starts else -1
+
+
+def _payload_start(text: str) -> int:
+    """Index just past the ``` fence line, 0 without a fence, or -1 while that line is incomplete"""
+    fence = text.find("```")
+    if fence == -1:
+        return 0
+    line_end = text.find("\n", fence + 3)
+    return -1 if line_end == -1 else line_end + 1
+
+
+def extract_json(text: str, openers: str = "{[") -> Any:
+    """
+    Parse the JSON payload of a complete response, skipping prose around it
+
+    The payload starts after a ``` fence when there is one and ends at the
+    closing fence. Each opening character is tried in turn, so brackets in
+    the prose (e.g. "[note]") don't hide the payload: the first value that
+    runs to the end of the payload wins, otherwise the longest value found.
+
+    Args:
+        text: The full response text
+        openers: Characters a payload may start with ("{" for objects only)
+
+    Raises:
+        ValueError: When the text holds no JSON value
+    """
+    start = max(_payload_start(text), 0)
+    fence_end = text.find("```", start) if start else -1
+    end = len(text[:fence_end].rstrip()) if fence_end != -1 else len(text.rstrip())
+
+    best, best_length = None, 0
+    pos = _next_json_start(text, start, openers)
+    while pos != -1 and pos < end:
+        try:
+            value, value_end = fast_json.decode_prefix(text, pos)
+        except fast_json.JSONDecodeError:
+            pos = _next_json_start(text, pos + 1, openers)
+            continue
+
+        if value_end >= end:
+            return value
+        if value_end - pos > best_length:
+            best, best_length = value, value_end - pos
+        pos = _next_json_start(text, value_end, openers)
+
+    if best_length:
+        return best
+    raise ValueError("No JSON found in response")
+
+
+class JsonArrayItemScanner:
+    """
+    Incrementally finds complete items of a top-level JSON array
+
+    Text before the opening '[' (e.g. a ```json fence) is ignored, and so is a
+    bracketed aside in that text such as "[note]": an array whose first
+    non-blank character cannot start an item is treated as prose. Each call to
+    feed scans only the new characters, so total work is linear in the
+    response length.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._done = False
+        self._item_parts: List[str] = []
+        self._in_item = False
+        self._has_items = False
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Scan the next piece of the response
+
+        Args:
+            chunk: Newly received text
+
+        Returns:
+            JSON texts of the array items completed within this chunk
+        """
+        items = []
+        if self._done:
+            return items
+
+        item_start = 0
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if self._depth == 0:
+                # Outside the array: wait for it to open
+                if ch == "[":
+                    self._depth = 1
+                continue
+
+            if self._depth == 1 and not self._has_items and ch not in _ARRAY_LEVEL_CHARS:
+                # Not the payload array: keep looking for the real one
+                self._depth = 0
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 1:
+                    self._in_item = True
+                    self._has_items = True
+                    item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._in_item:
+                    self._item_parts.append(chunk[item_start:i + 1])
+                    items.append("".join(self._item_parts))
+                    self._item_parts = []
+                    self._in_item = False
+                elif self._depth == 0:
+                    self._done = True
+                    break
+
+        if self._in_item:
+            self._item_parts.append(chunk[item_start:])
+
+        return items
+
+
+class JsonObjectScanner:
+    """
+    Incrementally detects when the first top-level JSON object is complete
+
+    Braces inside strings are ignored. Text before the opening '{' (e.g. a
+    ```json fence or prose) is skipped, and anything after the closing '}'
+    is never scanned.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._parts: List[str] = []
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Scan the next piece of the response
+
+        Args:
+            chunk: Newly received text
+
+        Returns:
+            JSON text of the object once its closing brace arrives, otherwise None
+        """
+        start = 0
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == "{":
+                if self._depth == 0:
+                    start = i
+                self._depth += 1
+            elif self._depth == 0:
+                # Outside the object: wait for it to open
+                continue
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:i + 1])
+                    return "".join(self._parts)
+
+        if self._depth > 0:
+            self._parts.append(chunk[start:])
+        return None
+
+
+class JsonStreamAccumulator:
+    """
+    Accumulates streamed response text and parses it once it looks complete
+
+    Chunks are kept in a list and joined only when a parse is attempted, which
+    happens only when a chunk ends with a closing brace or bracket. This keeps
+    accumulation linear instead of quadratic string concatenation.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+
+    @property
+    def text(self) -> str:
+        """The full text received so far"""
+        return "".join(self._parts)
+
+    def add(self, chunk: str) -> Optional[Any]:
+        """
+        Add the next piece of the response
+
+        Args:
+            chunk: Newly received text
+
+        Returns:
+            The parsed JSON value once the response is complete, otherwise None
+        """
+        self._parts.append(chunk)
+        if not chunk.rstrip().endswith(("}", "]")):
+            return None
+        return self._parse(self.text)
+
+    @staticmethod
+    def _parse(text: str) -> Optional[Any]:
+        """
+        Parse the JSON value that ends the text, skipping any leading prose
+
+        The payload starts after a ``` fence when there is one. Otherwise each
+        '{' or '[' is tried in turn, so brackets in the prose (e.g. "[note]")
+        don't hide the payload that follows them.
+        """
+        search_from = _payload_start(text)
+        if search_from == -1:
+            return None
+
+        end = len(text.rstrip())
+        start = _next_json_start(text, search_from)
+        while start != -1:
+            try:
+                value, value_end = fast_json.decode_prefix(text, start)
+            except fast_json.JSONDecodeError as e:
+                # The payload is still arriving; a value nested inside it
+                # must not be mistaken for the whole response
+                if e.pos >= end or e.msg.startswith("Unterminated string"):
+                    return None
+                start = _next_json_start(text, start + 1)
+                continue
+
+            if value_end >= end:
+                return value
+            # A complete value followed by more text was part of the prose
+            start = _next_json_start(text, value_end)
+        return None
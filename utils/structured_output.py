@@ -0,0 +1,48 @@
+"""
+Helpers for requesting schema-constrained JSON responses (structured outputs)
+"""
+from typing import Any, Dict, List
+
+
+def string_array() -> Dict[str, Any]:
+    """Schema for an array of strings"""
+    return {"type": "array", "items": {"type": "string"}}
+
+
+def strict_object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Schema for an object where every property is required
+
+    Strict structured outputs require all properties to be listed as required
+    and additional properties to be disallowed.
+    """
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def enum_string(values: List[str]) -> Dict[str, Any]:
+    """Schema for a string restricted to the given values"""
+    return {"type": "string", "enum": values}
+
+
+def json_schema_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a response_format that constrains the response to a JSON schema
+
+    The top level of a structured-output schema must be an object.
+
+    Args:
+        name: Schema name reported to the provider
+        schema: JSON schema for the response object
+
+    Returns:
+        Value for the response_format request parameter
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": schema, "strict": True}
+    }
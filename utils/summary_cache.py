@@ -0,0 +1,84 @@
+"""
+Disk-backed cache of summaries keyed by a content hash
+"""
+import copy
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from utils import fast_json
+
+
+class SummaryCache:
+    """
+    Persists summaries in a JSON file so re-uploaded documents skip the LLM
+
+    The whole file is loaded into memory on first use, so lookups are dict
+    reads; writes go to a temporary file that atomically replaces the cache.
+    save only rewrites the file when summaries were added since the last save.
+    """
+
+    FILENAME = "summary_cache.json"
+
+    def __init__(self, cache_dir: str, max_entries: int = 4096):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory holding the cache file (created on save)
+            max_entries: Maximum number of cached summaries (oldest evicted first)
+        """
+        self.path = os.path.join(cache_dir, self.FILENAME)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data: Dict[str, Any] = self._load()
+        self._dirty = False
+
+    @staticmethod
+    def make_key(model: str, system_message: str, document_text: str) -> str:
+        """Build the cache key for a summary request"""
+        payload = "\x00".join([model, system_message, document_text])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self) -> Dict[str, Any]:
+        """Read the cache file, starting empty if it is missing or unreadable"""
+        try:
+            with open(self.path, "rb") as f:
+                data = fast_json.loads(f.read())
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached summary, or None on a miss"""
+        value = self._data.get(key)
+        return copy.deepcopy(value) if value is not None else None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Add a summary to the in-memory cache (call save to persist)"""
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = copy.deepcopy(value)
+            while len(self._data) > self.max_entries:
+                del self._data[next(iter(self._data))]
+            self._dirty = True
+
+    def save(self):
+        """Write the cache to disk if it changed since the last save"""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            payload = fast_json.dumpb(self._data)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
+
+
+@lru_cache(maxsize=None)
+def get_summary_cache(cache_dir: str) -> SummaryCache:
+    """Get the process-wide summary cache for a directory"""
+    return SummaryCache(cache_dir)